@@ -0,0 +1,257 @@
+# app/collector.py
+
+import time
+import threading
+from collections import Counter
+
+from utils.trackir import (TrackIR_6DOF_Data, RAW_SAMPLE_DTYPE, POSE_FIELDS, decode_6dof, decode_fields,
+                           npResultToString, NP_OK, NP_ERR_NO_DATA, NP_ERR_INTERNAL_DATA)
+from utils.sample_ring import SampleRing, OVERWRITE_OLDEST
+from utils.scheduler import DeadlineScheduler
+
+class FrameTracker:
+    """ Follows the TrackIR frame counter to tell new frames from repeated polls and count dropped frames.
+
+        It also keeps a smoothed estimate of the camera frame period, and suggests a poll interval of
+        `oversample` polls per camera frame, so we poll faster than the camera without spinning.
+    """
+
+    # The frame counter is a 16 bit short, so it wraps around. A jump larger than this is treated as
+    # the TrackIR software restarting rather than as dropped frames
+    MAX_FRAME_JUMP = 1000
+
+    def __init__(self, nominal_rate=120.0, oversample=2.0, min_interval=0.001, max_interval=0.05, smoothing=0.05):
+        self.oversample = oversample
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.frame_period = 1 / nominal_rate
+        self.last_frame = None
+        self.last_frame_time = None
+
+        # 통계
+        self.new_frames = 0
+        self.repeated_polls = 0
+        self.dropped_frames = 0
+        self.resets = 0
+
+    @property
+    def camera_rate(self):
+        return 1 / self.frame_period
+
+    @property
+    def poll_interval(self):
+        interval = self.frame_period / self.oversample
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def update(self, frame, timestamp):
+        """ Feed the frame counter of one poll. Returns True if it is a new frame """
+        if frame == self.last_frame:
+            self.repeated_polls += 1
+            return False
+
+        if self.last_frame is not None:
+            step = (frame - self.last_frame) & 0xFFFF
+            if step > self.MAX_FRAME_JUMP:
+                self.resets += 1
+            else:
+                self.dropped_frames += step - 1
+                period = (timestamp - self.last_frame_time) / step
+                self.frame_period += self.smoothing * (period - self.frame_period)
+
+        self.last_frame = frame
+        self.last_frame_time = timestamp
+        self.new_frames += 1
+        return True
+
+    def stats(self):
+        return {
+            'new_frames': self.new_frames,
+            'repeated_polls': self.repeated_polls,
+            'dropped_frames': self.dropped_frames,
+            'resets': self.resets,
+            'camera_rate': self.camera_rate,
+            'poll_interval': self.poll_interval,
+        }
+
+class DataCollector(threading.Thread):
+    """ Polls the TrackIR and hands new frames to the UI thread through a lock-free SampleRing.
+
+        NP_GetData writes straight into the ring's preallocated RAW_SAMPLE_DTYPE records, so polling
+        allocates nothing. The UI takes everything pending at once with drain_samples(), which decodes
+        the whole batch in one call. If the UI stalls for more than ring_size samples (about 8 seconds
+        at 120Hz) the ring's policy decides what is lost (see utils/sample_ring.py); memory never grows.
+
+        Polls that return a frame we have already seen are not queued, and the poll interval follows the
+        camera rate measured by self.frame_tracker, which also counts repeated and dropped frames.
+        Polls are paced by a DeadlineScheduler, and timestamps come from the monotonic time.perf_counter()
+        clock, so compare them against time.perf_counter() rather than time.time().
+        notify (e.g. TkWakeup.notify) is called from the collector thread after every new sample, so it
+        must return at once without waiting for the UI.
+
+        The source is polled with poll(), which returns the DLL status code instead of raising. Batched
+        sources (e.g. the pose bus) are drained with read_samples() instead, keeping their own timestamps.
+        Failed polls are counted per status in self.status_counts and handled by STATUS_POLICY:
+          'skip'    - try again at the next regular poll
+          'retry'   - try again after the shortest poll interval
+          'backoff' - double the poll interval on every consecutive failure, up to max_backoff
+        'skip' statuses (no new data yet, e.g. the TrackIR software paused) are normal and don't count
+        as failures. Once other failures have gone on for failure_timeout seconds the reason is left in
+        self.error for the UI to show, and polling goes on with backoff; the next good poll clears it.
+        Separately, self.stalled is set while no new frame has come in for stall_timeout seconds,
+        whatever the polls return (e.g. NO_DATA forever). status_text() describes either for the UI,
+        and notify is called whenever one of them changes.
+    """
+
+    STATUS_POLICY = {
+        NP_ERR_NO_DATA: 'skip',
+        NP_ERR_INTERNAL_DATA: 'retry',
+    }
+    DEFAULT_POLICY = 'backoff'
+
+    def __init__(self, trackir, notify=None, ring_size=1024, ring_policy=OVERWRITE_OLDEST,
+                 failure_timeout=1.0, stall_timeout=2.0, max_backoff=0.5):
+        super().__init__()
+        self.trackir = trackir
+        self.notify = notify
+        self.samples = SampleRing(ring_size, RAW_SAMPLE_DTYPE, ring_policy)
+        # ctypes views of the records' tir_data, for the DLL to write into
+        offset = RAW_SAMPLE_DTYPE.fields['data'][1]
+        self._slots = [TrackIR_6DOF_Data.from_buffer(self.samples.buffer, i * RAW_SAMPLE_DTYPE.itemsize + offset)
+                       for i in range(ring_size)]
+        self._times = self.samples.buffer['time']
+        self._scratch = TrackIR_6DOF_Data()  # polled into while the ring is full with DROP_NEWEST
+
+        self.frame_tracker = FrameTracker()
+        self.scheduler = DeadlineScheduler(self.frame_tracker.poll_interval)
+        self.failure_timeout = failure_timeout
+        self.stall_timeout = stall_timeout
+        self.max_backoff = max_backoff
+        self.status_counts = Counter()
+        self.consecutive_failures = 0
+        self.failing_since = None
+        self.last_new_frame = None
+        self.error = None
+        self.stalled = False
+        self.running = True
+
+    def run(self):
+        batched = getattr(self.trackir, 'batched', False)
+        self.last_new_frame = time.perf_counter()
+        while self.running:
+            self.scheduler.wait()
+            self.check_stall(time.perf_counter())
+            if batched:
+                self.read_batch()
+                continue
+            index = self.samples.claim()
+            data = self._scratch if index is None else self._slots[index]
+            status = self.trackir.poll(data)
+            timestamp = time.perf_counter()
+            self.status_counts[status] += 1
+            if status != NP_OK:
+                self.handle_failure(status)
+                continue
+            self.handle_success()
+
+            if self.accept(index, data, timestamp) and self.notify is not None:
+                self.notify()  # 새로운 데이터가 있음을 알림
+            self.scheduler.set_period(self.frame_tracker.poll_interval)
+
+    def read_batch(self):
+        """ Move everything a batched source (see PoseSource.read_samples) has into the ring at once,
+            with the source's timestamps
+        """
+        records = self.trackir.read_samples()
+        if len(records) == 0:
+            self.status_counts[NP_ERR_NO_DATA] += 1
+            self.handle_failure(NP_ERR_NO_DATA)
+            return
+        self.status_counts[NP_OK] += len(records)
+        self.handle_success()
+
+        committed = False
+        for record in records:
+            index = self.samples.claim()
+            data = self._scratch if index is None else self._slots[index]
+            data.status = record['status']
+            data.frame = record['frame']
+            data.set_pose(*(float(record[name]) for name in POSE_FIELDS))
+            committed |= self.accept(index, data, float(record['time']))
+        if committed and self.notify is not None:
+            self.notify()
+        self.scheduler.set_period(self.frame_tracker.poll_interval)
+
+    def accept(self, index, data, timestamp):
+        """ Queue a polled sample if it is a new frame. Returns True if it went into the ring """
+        if not self.frame_tracker.update(data.frame, timestamp):
+            return False
+        self.last_new_frame = timestamp
+        committed = index is not None
+        if committed:
+            self._times[index] = timestamp
+            self.samples.commit()
+        else:
+            self.samples.drop()
+        self.handle_sample(timestamp, data)
+        return committed
+
+    def check_stall(self, now):
+        stalled = now - self.last_new_frame >= self.stall_timeout
+        if stalled != self.stalled:
+            self.stalled = stalled
+            if self.notify is not None:
+                self.notify()  # so the UI shows or clears it
+
+    def status_text(self):
+        """ What is wrong with the input, for the UI, or None """
+        if self.error is not None:
+            return "Restart TrackIR: {}".format(self.error)
+        if self.stalled:
+            return "No new frames from the TrackIR for {:.0f} s".format(time.perf_counter() - self.last_new_frame)
+        return None
+
+    def handle_success(self):
+        self.consecutive_failures = 0
+        self.failing_since = None
+        if self.error is not None:
+            self.error = None
+            if self.notify is not None:
+                self.notify()  # so the UI clears the error
+
+    def handle_failure(self, status):
+        policy = self.STATUS_POLICY.get(status, self.DEFAULT_POLICY)
+        if policy == 'skip':
+            self.scheduler.set_period(self.frame_tracker.poll_interval)
+            return
+
+        now = time.perf_counter()
+        self.consecutive_failures += 1
+        if self.failing_since is None:
+            self.failing_since = now
+        if now - self.failing_since >= self.failure_timeout:
+            first = self.error is None
+            self.error = Exception("polls failing for {:.1f} s ({} in a row), last status {}: {}".format(
+                now - self.failing_since, self.consecutive_failures, status, npResultToString(status)))
+            if first and self.notify is not None:
+                self.notify()  # so the UI shows the error
+            policy = 'backoff'
+
+        if policy == 'retry':
+            interval = self.frame_tracker.min_interval
+        else:
+            interval = min(self.frame_tracker.poll_interval * 2 ** min(self.consecutive_failures, 16), self.max_backoff)
+        self.scheduler.set_period(interval)
+
+    def handle_sample(self, timestamp, data):
+        """ Hook for subclasses to process every new frame on the collector thread """
+        pass
+
+    def drain_samples(self, fields=None):
+        """ Called from the UI thread. Takes every pending sample and returns (timestamps, samples), where
+            samples is an (N, 6) array of roll, pitch, yaw, x, y, z (see utils.trackir.decode_6dof),
+            or an (N, len(fields)) array of the given field names (see utils.trackir.decode_fields)
+        """
+        records = self.samples.drain()
+        raw = records['data']
+        return records['time'], decode_6dof(raw) if fields is None else decode_fields(raw, fields)
@@ -0,0 +1,136 @@
+# app/evaluate.py
+
+""" Runs recorded sessions through the HUD's gesture engine, without a camera or a window.
+
+      python -m app.evaluate data/rawdata/session_20240101_120000
+      python -m app.evaluate data/rawdata/*.tirrec --dwell 0.8 1.0 1.2 --max-gauge 3 4 --filter none one_euro
+
+    With a single parameter set it prints the action timeline of every recording and per-zone statistics;
+    with several values for any option it evaluates every combination (spread over --jobs processes)
+    and prints one summary line per combination.
+    Zones are given as LOW:HIGH in degrees, e.g. --yaw-left 15:25 12:25.
+"""
+import argparse
+import itertools
+import multiprocessing
+import time
+
+import numpy as np
+
+from utils.trackir import YAW, PITCH, POSE_FIELDS
+from utils.reader import open_recording
+from utils.gestures import GestureEngine, default_rules, DEFAULT_ZONES, DEFAULT_DWELL, DEFAULT_MAX_GAUGE
+from utils.filters import FILTERS, FilterStage
+
+_recordings = {}  # path -> (times, poses), per worker process
+
+def load(path):
+    """ (times, poses) of a whole recording: seconds since its start and (N, 6) roll .. z """
+    if path not in _recordings:
+        with open_recording(path) as recording:
+            records = recording.window(0.0, np.inf)
+        poses = np.column_stack([records[name] for name in POSE_FIELDS]).astype(np.float64)
+        _recordings[path] = (records['time'].astype(np.float64), poses)
+    return _recordings[path]
+
+def duration(path):
+    times = load(path)[0]
+    return float(times[-1]) if len(times) else 0.0
+
+def make_engine(params):
+    rules = default_rules(params['dwell'], **{zone: params[zone] for zone in DEFAULT_ZONES})
+    return GestureEngine(rules, max_gauge=params['max_gauge'])
+
+def evaluate(params, paths):
+    """ Events of every recording for one parameter set, as {path: [GestureEvent, ...]} """
+    results = {}
+    for path in paths:
+        times, poses = load(path)
+        if params['filter'] != 'none':
+            poses = FilterStage(FILTERS[params['filter']](), axes=(YAW, PITCH)).process(times, poses)
+        results[path] = make_engine(params).process(times, poses)
+    return results
+
+def _evaluate_job(job):
+    # Durations come back from the worker too, so the parent never loads the recordings
+    params, paths = job
+    return params, evaluate(params, paths), {path: duration(path) for path in paths}
+
+def zone_stats(events):
+    """ Per zone: releases, how many had a gauge (the ones that act), and mean/max gauge """
+    stats = {}
+    for zone in DEFAULT_ZONES:
+        gauges = np.array([event.gauge for event in events if event.action == zone])
+        stats[zone] = {
+            'releases': len(gauges),
+            'actions': int(np.count_nonzero(gauges > 0)),
+            'mean_gauge': float(gauges[gauges > 0].mean()) if np.any(gauges > 0) else 0.0,
+            'max_gauge': float(gauges.max()) if len(gauges) else 0.0,
+        }
+    return stats
+
+def print_timeline(path, events, duration):
+    print("{} ({:.1f} s)".format(path, duration))
+    for event in events:
+        marker = "" if event.gauge > 0 else "  (no gauge)"
+        print("  {:9.3f} s  {:<10}  gauge {:.2f}{}".format(event.time, event.action, event.gauge, marker))
+
+def print_stats(events):
+    print("{:<10} {:>8} {:>8} {:>11} {:>10}".format('zone', 'releases', 'actions', 'mean gauge', 'max gauge'))
+    for zone, stats in zone_stats(events).items():
+        print("{:<10} {releases:>8} {actions:>8} {mean_gauge:>11.2f} {max_gauge:>10.2f}".format(zone, **stats))
+
+def _describe(params, varied):
+    return " ".join("{}={}".format(name, ':'.join('{:g}'.format(v) for v in params[name])
+                                   if isinstance(params[name], tuple) else params[name]) for name in varied)
+
+def _zone(text):
+    low, high = (float(value) for value in text.split(':'))
+    return (min(low, high), max(low, high))
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the gesture zones offline on recorded sessions")
+    parser.add_argument('paths', nargs='+', help="recordings: .tirrec, .csv or session directories")
+    for zone, (axis, low, high) in DEFAULT_ZONES.items():
+        parser.add_argument('--' + zone.replace('_', '-'), dest=zone, type=_zone, nargs='+',
+                            default=[(low, high)], metavar='LOW:HIGH')
+    parser.add_argument('--dwell', type=float, nargs='+', default=[DEFAULT_DWELL], help="seconds before the gauge fills")
+    parser.add_argument('--max-gauge', dest='max_gauge', type=float, nargs='+', default=[DEFAULT_MAX_GAUGE])
+    parser.add_argument('--filter', nargs='+', default=['none'], choices=['none'] + sorted(FILTERS))
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    names = list(DEFAULT_ZONES) + ['dwell', 'max_gauge', 'filter']
+    grid = [dict(zip(names, values)) for values in itertools.product(*(getattr(args, name) for name in names))]
+    varied = [name for name in names if len(getattr(args, name)) > 1]
+
+    started = time.perf_counter()
+    jobs = [(params, args.paths) for params in grid]
+    if len(grid) == 1:
+        results = [_evaluate_job(jobs[0])]
+    else:
+        with multiprocessing.Pool(args.jobs) as pool:
+            results = pool.map(_evaluate_job, jobs)
+    elapsed = time.perf_counter() - started
+    durations = results[0][2]
+    recorded = sum(durations.values())
+
+    if len(grid) == 1:
+        params, by_path, _ = results[0]
+        for path, events in by_path.items():
+            print_timeline(path, events, durations[path])
+        print()
+        print_stats([event for events in by_path.values() for event in events])
+    else:
+        for params, by_path, _ in results:
+            stats = zone_stats([event for events in by_path.values() for event in events])
+            print("{:<40} ".format(_describe(params, varied)) +
+                  "  ".join("{} {}/{} ({:.2f})".format(zone, s['actions'], s['releases'], s['mean_gauge'])
+                            for zone, s in stats.items()))
+
+    print()
+    print("{} parameter set(s) x {:.1f} s of recordings in {:.2f} s ({:.0f}x real time)".format(
+        len(grid), recorded, elapsed, len(grid) * recorded / elapsed if elapsed > 0 else float('inf')))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# app/hud.py
+
+import tkinter as tk
+
+class Hud:
+    """ The yaw/pitch number lines and dwell gauges of the head motion HUD, drawn on a tk.Canvas.
+
+        All items are created once in __init__; update() only moves the markers and gauge fills with
+        coords() and changes texts with itemconfig(), and skips items whose value didn't change.
+        Call it once per UI frame with the latest state, however many samples came in since.
+
+        yaw_zones and pitch_zones are lists of ((low, high), color) drawn over each number line.
+    """
+
+    # 레이아웃 정의: 넘버라인 → 게이지 → 넘버라인 → 게이지
+    YAW_RANGE = (-45, 45)
+    PITCH_RANGE = (-30, 30)
+    YAW_LINE_Y = 60
+    YAW_GAUGE_Y = 100
+    PITCH_LINE_Y = 160
+    PITCH_GAUGE_Y = 200
+    STATS_Y = 245
+
+    # 게이지 길이/위치
+    GAUGE_MAX_WIDTH = 200
+    GAUGE_HEIGHT = 15
+    GAUGE_X_START = 150
+    MARKER_RADIUS = 5
+    FONT = ("Arial", 10)
+
+    def __init__(self, canvas, yaw_zones, pitch_zones, width=400):
+        self.canvas = canvas
+        self.width = width
+        self._state = {}
+
+        self.yaw = self._axis(self.YAW_RANGE, self.YAW_LINE_Y, self.YAW_GAUGE_Y, yaw_zones, label_dy=-15)
+        self.pitch = self._axis(self.PITCH_RANGE, self.PITCH_LINE_Y, self.PITCH_GAUGE_Y, pitch_zones, label_dy=15)
+        self.stats = canvas.create_text(width / 2, self.STATS_Y, text="", fill='black', font=("Arial", 8))
+
+    def _map(self, value, value_range):
+        low, high = value_range
+        return 20 + (value - low) / (high - low) * (self.width - 40)
+
+    def _axis(self, value_range, line_y, gauge_y, zones, label_dy):
+        """ Create the items of one number line and its gauge. Returns the ones update() changes """
+        canvas = self.canvas
+        canvas.create_line(20, line_y, self.width - 20, line_y, fill='black')
+        for (low, high), color in zones:
+            canvas.create_line(self._map(low, value_range), line_y, self._map(high, value_range), line_y,
+                               width=5, fill=color)
+
+        gauge_x_end = self.GAUGE_X_START + self.GAUGE_MAX_WIDTH
+        canvas.create_rectangle(self.GAUGE_X_START, gauge_y, gauge_x_end, gauge_y + self.GAUGE_HEIGHT, outline='black')
+        return {
+            'range': value_range,
+            'line_y': line_y,
+            'gauge_y': gauge_y,
+            'label_dy': label_dy,
+            'marker': canvas.create_oval(0, 0, 0, 0, fill='red', state=tk.HIDDEN),
+            'value': canvas.create_text(0, 0, text="", fill='black', font=self.FONT),
+            'fill': canvas.create_rectangle(self.GAUGE_X_START, gauge_y, self.GAUGE_X_START, gauge_y + self.GAUGE_HEIGHT,
+                                            fill='green', outline=''),
+            'action': canvas.create_text(self.GAUGE_X_START - 10, gauge_y + self.GAUGE_HEIGHT / 2, text="",
+                                         fill='black', font=self.FONT, anchor='e'),
+        }
+
+    def _set(self, item, key, value, apply):
+        # Only touch the canvas when something changed
+        if self._state.get((item, key)) != value:
+            self._state[(item, key)] = value
+            apply(value)
+
+    def _update_axis(self, axis, value, gauge_ratio, action_text):
+        canvas = self.canvas
+        x = self._map(value, axis['range'])
+        y = axis['line_y']
+        r = self.MARKER_RADIUS
+        self._set(axis['marker'], 'coords', (x - r, y - r, x + r, y + r),
+                  lambda c: canvas.coords(axis['marker'], *c))
+        self._set(axis['marker'], 'state', tk.NORMAL, lambda s: canvas.itemconfig(axis['marker'], state=s))
+        self._set(axis['value'], 'coords', (x, y + axis['label_dy']), lambda c: canvas.coords(axis['value'], *c))
+        self._set(axis['value'], 'text', f"{value:.2f}", lambda t: canvas.itemconfig(axis['value'], text=t))
+
+        fill_end = self.GAUGE_X_START + self.GAUGE_MAX_WIDTH * gauge_ratio
+        gauge_y = axis['gauge_y']
+        self._set(axis['fill'], 'coords', (self.GAUGE_X_START, gauge_y, fill_end, gauge_y + self.GAUGE_HEIGHT),
+                  lambda c: canvas.coords(axis['fill'], *c))
+        self._set(axis['action'], 'text', action_text, lambda t: canvas.itemconfig(axis['action'], text=t))
+
+    def update(self, yaw, pitch, yaw_gauge_ratio, pitch_gauge_ratio, yaw_action="", pitch_action=""):
+        """ Show the latest yaw/pitch (degrees), gauge fill ratios (0..1) and action labels """
+        self._update_axis(self.yaw, yaw, yaw_gauge_ratio, yaw_action)
+        self._update_axis(self.pitch, pitch, pitch_gauge_ratio, pitch_action)
+
+    def update_stats(self, stats, recent=None):
+        """ Show running statistics of yaw and pitch, a RunningStats with those two channels, and
+            the mean and sd of recent, an (N, 2) array of the latest yaw/pitch samples (e.g. History.view())
+        """
+        if stats.count == 0:
+            return
+        lines = ["{} mean {:.2f} sd {:.2f} min {:.2f} max {:.2f}".format(
+            name, stats.mean[i], stats.std[i], stats.min[i], stats.max[i]) for i, name in enumerate(('Yaw', 'Pitch'))]
+        if recent is not None and len(recent):
+            mean = recent.mean(axis=0)
+            std = recent.std(axis=0)
+            lines.append("Last {} samples: yaw {:.2f} sd {:.2f}, pitch {:.2f} sd {:.2f}".format(
+                len(recent), mean[0], std[0], mean[1], std[1]))
+        text = "\n".join(lines)
+        self._set(self.stats, 'text', text, lambda t: self.canvas.itemconfig(self.stats, text=t))
@@ -0,0 +1,76 @@
+# app/popup.py
+
+from collections import deque
+import tkinter as tk
+
+class PopupOverlay:
+    """ One borderless, topmost window that shows popup images in the middle of the screen.
+
+        The window and its canvas are created once and only shown, hidden and moved afterwards.
+        show() displays the images for `duration` seconds; popups that come in while one is showing
+        wait in a queue (the oldest are dropped beyond max_queue) and follow one after another.
+    """
+
+    SPACING = 20
+
+    def __init__(self, root, duration=1.0, max_queue=8, bg='white'):
+        self.root = root
+        self.duration = duration
+        self.queue = deque(maxlen=max_queue)
+        self.visible = False
+        self.images = []  # 표시 중인 이미지가 GC되지 않도록 참조 유지
+        self._geometry = None
+
+        self.window = tk.Toplevel(root)
+        self.window.overrideredirect(True)
+        self.window.attributes("-topmost", True)
+        self.window.withdraw()
+        self.canvas = tk.Canvas(self.window, bg=bg, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self._items = []  # reused image items
+
+    def show(self, images):
+        """ Show a list of PhotoImages side by side, after any popups already showing or waiting """
+        if not images:
+            return
+        if self.visible:
+            self.queue.append(images)
+        else:
+            self._display(images)
+
+    def _display(self, images):
+        total_width = sum(img.width() for img in images) + (len(images) - 1) * self.SPACING
+        max_height = max(img.height() for img in images)
+        x_pos = (self.root.winfo_screenwidth() - total_width) // 2
+        y_pos = (self.root.winfo_screenheight() - max_height) // 2
+
+        geometry = f"{total_width}x{max_height}+{x_pos}+{y_pos}"
+        if geometry != self._geometry:
+            self.window.geometry(geometry)
+            self.canvas.config(width=total_width, height=max_height)
+            self._geometry = geometry
+
+        while len(self._items) < len(images):
+            self._items.append(self.canvas.create_image(0, 0, anchor='center'))
+        cur_x = 0
+        for item, img in zip(self._items, images):
+            self.canvas.coords(item, cur_x + img.width() // 2, max_height // 2)
+            self.canvas.itemconfig(item, image=img, state=tk.NORMAL)
+            cur_x += img.width() + self.SPACING
+        for item in self._items[len(images):]:
+            self.canvas.itemconfig(item, state=tk.HIDDEN)
+        self.images = images
+
+        if not self.visible:
+            self.window.deiconify()
+            self.window.lift()
+            self.visible = True
+        self.root.after(int(self.duration * 1000), self._next)
+
+    def _next(self):
+        if self.queue:
+            self._display(self.queue.popleft())
+        else:
+            self.window.withdraw()
+            self.visible = False
+            self.images = []
@@ -0,0 +1,75 @@
+# app/pose_server.py
+
+""" Owns the TrackIR session and publishes every new frame on the shared memory pose bus.
+
+    Start this once, then run any number of apps on the bus instead of the camera, e.g.
+
+      python -m app.pose_server
+      python main.py --bus
+"""
+import argparse
+import tkinter as tk
+
+from app.collector import DataCollector
+from utils.pose_bus import PoseBusPublisher, DEFAULT_NAME
+from utils.pose_source import SyntheticSource
+from utils.trackir_wrapper import TrackIRWrapper
+
+class PublishingDataCollector(DataCollector):
+    def __init__(self, trackir, publisher):
+        super().__init__(trackir, None)
+        self.publisher = publisher
+
+    def handle_sample(self, timestamp, data):
+        self.publisher.publish(timestamp, data)
+
+class PoseServer:
+    def __init__(self, name=DEFAULT_NAME, capacity=4096, source=None):
+        # TrackIR는 윈도우 핸들이 필요하므로 작은 창을 띄운다
+        self.root = tk.Tk()
+        self.root.title("TrackIR Pose Bus")
+        self.label = tk.Label(self.root, text="", width=60)
+        self.label.pack(padx=10, pady=10)
+
+        if source is not None:
+            self.trackir = source
+        else:
+            try:
+                self.trackir = TrackIRWrapper(self.root.wm_frame())
+            except Exception as e:
+                print("Restart TrackIR", e)
+                return
+
+        self.publisher = PoseBusPublisher(name, capacity)
+        self.data_collector = PublishingDataCollector(self.trackir, self.publisher)
+        self.data_collector.start()
+
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.update_status()
+        self.root.mainloop()
+
+    def update_status(self):
+        stats = self.data_collector.frame_tracker.stats()
+        self.label.config(text="{} samples, {:.1f} Hz, dropped {}".format(
+            self.publisher.seq, stats['camera_rate'], stats['dropped_frames']))
+        self.root.after(500, self.update_status)
+
+    def close(self):
+        self.data_collector.running = False
+        self.data_collector.join()
+        self.trackir.close()
+        self.publisher.close()
+        self.root.destroy()
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish TrackIR samples on the shared memory pose bus")
+    parser.add_argument('--name', default=DEFAULT_NAME, help="shared memory block name")
+    parser.add_argument('--capacity', type=int, default=4096, help="ring buffer size in samples")
+    parser.add_argument('--synthetic', metavar='PROFILE', help="publish generated motion instead of the TrackIR")
+    args = parser.parse_args()
+
+    source = SyntheticSource(profile=args.synthetic) if args.synthetic else None
+    PoseServer(args.name, args.capacity, source)
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,97 @@
 # app/app.py
 
+import argparse
+import math
 import time
 import tkinter as tk
-import csv
 import datetime
 import os
-import threading
-from queue import Queue
-
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from utils.trackir_wrapper import TrackIRWrapper
-
-class DataCollector(threading.Thread):
-    def __init__(self, trackir, data_queue, data_event):
-        super().__init__()
-        self.trackir = trackir
-        self.data_queue = data_queue
-        self.data_event = data_event
-        self.recording = False
-        self.csvwriter = None
-        self.csvfile = None  # 파일 객체 저장
-        self.running = True
-
-    def run(self):
-        while self.running:
-            data = self.trackir.get_data()
-            self.data_queue.put((time.time(), data))
-            self.data_event.set()  # 새로운 데이터가 있음을 알림
-
-            if self.recording and self.csvwriter and self.csvfile:
-                self.csvwriter.writerow(
-                    [data.frame, data.roll, data.pitch, data.yaw, data.x, data.y, data.z])
-
-                # 파일 버퍼를 즉시 기록
-                self.csvfile.flush()
-
-            time.sleep(1/120)  # 120Hz로 데이터 수집
+from utils.pose_source import SyntheticSource
+from utils.pose_bus import PoseBusSource, DEFAULT_NAME
+from utils.trackir import (NPFIELDS_6DOF, NPFIELDS_RAW, NPFIELDS_DELTA, NPFIELDS_SMOOTH, NPFIELDS_ALL,
+                           fields_for_mask)
+from utils.session import SessionRecorder
+from utils.decimate import Decimator
+from app.tk_strip_chart import TkStripChart
+from app.collector import DataCollector
+from app.wakeup import TkWakeup
+
+class RecordingDataCollector(DataCollector):
+    def __init__(self, trackir, notify):
+        super().__init__(trackir, notify)
+        self.recorder = None  # 녹화 중일 때만 BinaryRecorder
+
+        # Only record the fields the source was asked for (see utils.trackir.NPFIELDS_*)
+        self.fields = fields_for_mask(trackir.data_fields)
+
+    def handle_sample(self, timestamp, data):
+        # Only copies the sample into the recorder's batch; its writer thread does the disk I/O
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.write(timestamp, data)
+
+# (menu label, seconds shown) - None shows the whole session
+ZOOM_LEVELS = [
+    ('10 s', 10),
+    ('1 min', 60),
+    ('10 min', 600),
+    ('1 h', 3600),
+    ('Session', None),
+]
+
+# --fields names -> NP_RequestData bits (see utils/trackir.py)
+FIELD_GROUPS = {
+    '6dof': NPFIELDS_6DOF,
+    'raw': NPFIELDS_RAW,
+    'delta': NPFIELDS_DELTA,
+    'smooth': NPFIELDS_SMOOTH,
+    'all': NPFIELDS_ALL,
+}
+
+PLOT_LABELS = ['Roll', 'Pitch', 'Yaw', 'X', 'Y', 'Z']
+PLOT_LIMITS = [(-100, 100), (-100, 100), (-100, 100),
+               (-200, 200), (-200, 200), (-200, 200)]
 
 class Record:
-    def __init__(self):
+    def __init__(self, source=None, data_fields=NPFIELDS_6DOF, blit=True, renderer='matplotlib'):
+        # source: a utils.pose_source.PoseSource to read instead of the TrackIR camera (replay/synthetic)
+        # data_fields: what to request from the TrackIR and record, e.g. NPFIELDS_6DOF | NPFIELDS_RAW
+        # blit: only redraw the six lines over a cached background (see update_plot)
+        # renderer: 'matplotlib', or 'tk' for the lightweight tk.Canvas charts (no matplotlib import at all)
         # Initialize variables
         self.recording = False
-        self.csvwriter = None
-        self.csvfile = None
-
-        # Data storage
-        self.times = []
-        self.start_time = time.time()
-        self.roll_data = []
-        self.pitch_data = []
-        self.yaw_data = []
-        self.x_data = []
-        self.y_data = []
-        self.z_data = []
-
-        self.max_time = 10  # seconds
-        self.data_points = 1200  # 120 Hz * 10 seconds
+        self.recorder = None
+
+        self.max_time = 10  # seconds shown, None for the whole session (see ZOOM_LEVELS)
+        self.data_points = 7200  # raw samples kept, 120 Hz * 60 seconds
+
+        # Data storage: the last data_points rows of time, roll, pitch, yaw, x, y, z, and min/max
+        # summaries of the whole session. Lines only get the min/max envelope of each pixel column
+        self.decimator = Decimator(6, raw_points=self.data_points)
+        self.start_time = time.perf_counter()  # DataCollector와 같은 시계
+
+        # Blitting: the axes, ticks and grids are drawn once into self.background and only the lines
+        # are drawn every frame. The time window jumps by a tenth of its length, so a full redraw
+        # happens once per jump instead of once per frame
+        self.renderer = renderer
+        self.blit = blit and renderer == 'matplotlib'
+        self.background = None
+        self.chart = None  # TkStripChart with renderer='tk'
+        self.xlim = None
+
+        # Achieved plot rate, updated about once a second
+        self.fps = 0.0
+        self.samples_per_second = 0.0
+        self._frames = 0
+        self._frame_samples = 0
+        self._fps_started = time.perf_counter()
 
         # Data save folder
         self.save_folder = 'data/rawdata'
+        self.chunk_seconds = 600  # 10분마다 새 chunk
+        self.codec = 'lzma'
         os.makedirs(self.save_folder, exist_ok=True)
 
         # Create tkinter app
@@ -84,50 +113,77 @@ class Record:
         self.stop_button.pack(side=tk.LEFT, padx=5, pady=5)
         self.stop_button.config(state=tk.DISABLED)
 
-        # Initialize plotting
-        self.fig, self.axes = plt.subplots(6, 1, figsize=(8, 12))
-        plt.subplots_adjust(hspace=0.5)
+        # Time window of the plot
+        self.zoom = tk.StringVar(value=ZOOM_LEVELS[0][0])
+        self.zoom_menu = tk.OptionMenu(self.button_frame, self.zoom, *[label for label, seconds in ZOOM_LEVELS],
+                                       command=self.set_zoom)
+        self.zoom_menu.pack(side=tk.LEFT, padx=5, pady=5)
 
-        # Create canvas and pack it
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
-        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        # Acquisition counters (camera rate, dropped frames)
+        self.stats_label = tk.Label(self.button_frame, text="")
+        self.stats_label.pack(side=tk.RIGHT, padx=5, pady=5)
 
-        # Initialize plots
-        self.initialize_plots()
+        # Initialize plotting
+        if renderer == 'tk':
+            self.chart = TkStripChart(self.root, PLOT_LABELS, PLOT_LIMITS)
+            self.chart.widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        else:
+            self.create_figure()
 
-        # Create data queue and event
-        self.data_queue = Queue()
-        self.data_event = threading.Event()
+        # Redraw when the collector has new samples, at most 60 times a second
+        self.wakeup = TkWakeup(self.root, self.update_plot, max_fps=60)
 
         # Create TrackIR instance
-        try:
-            self.trackir = TrackIRWrapper(self.root.wm_frame())
-        except Exception as e:
-            print("Restart TrackIR", e)
-            return
+        if source is not None:
+            self.trackir = source
+        else:
+            try:
+                self.trackir = TrackIRWrapper(self.root.wm_frame(), data_fields)
+            except Exception as e:
+                print("Restart TrackIR", e)
+                return
 
         # Start data collector thread
-        self.data_collector = DataCollector(
-            self.trackir, self.data_queue, self.data_event)
+        self.data_collector = RecordingDataCollector(
+            self.trackir, self.wakeup.notify)
         self.data_collector.start()
 
-        # Start the update loop
+        # Show anything that arrived before the main loop started
         self.update_plot()
 
         # Start the tkinter main loop
         self.root.mainloop()
 
+    def create_figure(self):
+        # matplotlib takes seconds to import, so only do it when it's used
+        import matplotlib
+        matplotlib.use('TkAgg')
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.fig, self.axes = plt.subplots(6, 1, figsize=(8, 12))
+        plt.subplots_adjust(hspace=0.5)
+
+        # Create canvas and pack it
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+
+        # Initialize plots
+        self.initialize_plots()
+        if self.blit:
+            # Any full draw (first show, resize, scrolling) refreshes the cached background
+            self.canvas.mpl_connect('draw_event', self.on_draw)
+
     def initialize_plots(self):
         # Initialize plots similar to your original code
-        labels = ['Roll', 'Pitch', 'Yaw', 'X', 'Y', 'Z']
-        data_limits = [(-100, 100), (-100, 100), (-100, 100),
-                       (-200, 200), (-200, 200), (-200, 200)]
+        labels = PLOT_LABELS
+        data_limits = PLOT_LIMITS
         self.lines = []
 
         for i, ax in enumerate(self.axes):
-            line, = ax.plot([], [], label=labels[i])
+            line, = ax.plot([], [], label=labels[i], animated=self.blit)
             ax.set_ylabel(labels[i])
-            ax.set_xlim(0, self.max_time)
+            ax.set_xlim(0, self.max_time or 10)
             ax.set_ylim(data_limits[i])
             ax.grid(True)
             self.lines.append(line)
@@ -135,21 +191,15 @@ class Record:
 
     def start_recording(self, event=None):
         if not self.recording:
-            # Create file
+            # Create session directory (see utils/session.py). Replay it with main.py --replay <dir>,
+            # convert it to CSV with python -m utils.recorder <dir>
             timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'raw_data_{timestamp}.csv'
-            filepath = os.path.join(self.save_folder, filename)
-            self.csvfile = open(filepath, 'w', newline='')
+            session_dir = os.path.join(self.save_folder, f'session_{timestamp}')
+            self.recorder = SessionRecorder(session_dir, self.data_collector.fields,
+                                            chunk_seconds=self.chunk_seconds, codec=self.codec)
 
-            # Write header
-            self.csvwriter = csv.writer(self.csvfile)
-            self.csvwriter.writerow(
-                ['Frame', 'Roll', 'Pitch', 'Yaw', 'X', 'Y', 'Z'])
-
-            # Pass csvwriter and csvfile to data collector
-            self.data_collector.csvwriter = self.csvwriter
-            self.data_collector.csvfile = self.csvfile  # csvfile 전달
-            self.data_collector.recording = True
+            # Pass recorder to data collector
+            self.data_collector.recorder = self.recorder
 
             self.recording = True
             print('Start Recording...')
@@ -163,69 +213,155 @@ class Record:
     def stop_recording(self, event=None):
         if self.recording:
             self.recording = False
-            self.data_collector.recording = False
-            self.csvfile.close()
-            self.csvwriter = None
-            self.csvfile = None
-            self.data_collector.csvwriter = None
-            self.data_collector.csvfile = None  # csvfile 초기화
+            self.data_collector.recorder = None
+            # The last chunk is compressed in the background, so the UI doesn't freeze
+            self.recorder.close(wait=False)
             print('Stop Recording')
 
-            # Update button states
-            self.start_button.config(state=tk.NORMAL)
+            # No new recording until this one is saved
+            self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.DISABLED)
+            self.finish_recording()
         else:
             print('Not Recording Now')
 
+    def finish_recording(self):
+        if not self.recorder.finished():
+            self.root.after(100, self.finish_recording)
+            return
+        if self.recorder.dropped:
+            print('Dropped {} samples while recording'.format(self.recorder.dropped))
+        print('Saved {}'.format(self.recorder.session_dir))
+        self.recorder = None
+        self.start_button.config(state=tk.NORMAL)
+
     def update_plot(self):
-        # Wait for new data
-        if self.data_event.is_set():
-            # Get data from queue
-            while not self.data_queue.empty():
-                timestamp, data = self.data_queue.get()
-
-                # Append data
-                current_time = timestamp - self.start_time
-                self.times.append(current_time)
-                self.roll_data.append(data.roll)
-                self.pitch_data.append(data.pitch)
-                self.yaw_data.append(data.yaw)
-                self.x_data.append(data.x)
-                self.y_data.append(data.y)
-                self.z_data.append(data.z)
-
-                # Keep only the last data_points
-                if len(self.times) > self.data_points:
-                    self.times = self.times[-self.data_points:]
-                    self.roll_data = self.roll_data[-self.data_points:]
-                    self.pitch_data = self.pitch_data[-self.data_points:]
-                    self.yaw_data = self.yaw_data[-self.data_points:]
-                    self.x_data = self.x_data[-self.data_points:]
-                    self.y_data = self.y_data[-self.data_points:]
-                    self.z_data = self.z_data[-self.data_points:]
-
-            # Update plots
-            data_list = [self.roll_data, self.pitch_data, self.yaw_data,
-                         self.x_data, self.y_data, self.z_data]
-            for i, line in enumerate(self.lines):
-                line.set_data(self.times, data_list[i])
-
-            # Adjust xlim
-            xmin = max(0, self.times[-1] - self.max_time)
-            xmax = self.times[-1]
-            for ax in self.axes:
-                ax.set_xlim(xmin, xmax)
+        # Polls keep failing or no new frames come in (the stats replace it once samples flow again)
+        message = self.data_collector.status_text()
+        if message is not None:
+            self.stats_label.config(text=message, fg='red')
+
+        # Called by TkWakeup when the collector has new samples.
+        # Get them from the ring, decoded as one (N, 6) block
+        timestamps, samples = self.data_collector.drain_samples()
+        if len(timestamps) == 0:
+            return
 
-            # Redraw canvas
+        # Append data (older rows fall out of the ring, the summaries keep growing)
+        times = timestamps - self.start_time
+        self.decimator.extend(times, samples[:, :6])
+
+        # Adjust xlim
+        xlim = self.window_limits(times[-1])
+        redraw = not self.blit or self.background is None or xlim != self.xlim
+        self.xlim = xlim
+
+        # Update plots with the min/max of every pixel column in the window
+        x, y = self.decimator.window(xlim[0], xlim[1], self.plot_columns())
+        if self.chart is not None:
+            # Only moves the existing line items
+            self.chart.set_xlim(*xlim)
+            self.chart.set_data(x, y)
+        else:
+            self.draw_figure(x, y, redraw)
+        self.count_frame(len(timestamps))
+
+        stats = self.data_collector.frame_tracker.stats()
+        timing = self.data_collector.scheduler.stats()
+        samples = self.data_collector.samples
+        self.stats_label.config(text="{:.1f} Hz, dropped {}, repeated {}, late p99 {:.0f} us, overruns {}, "
+                                     "plot {:.0f} fps ({:.0f} samples/s)".format(
+            stats['camera_rate'], stats['dropped_frames'], stats['repeated_polls'], timing['p99_lateness_us'],
+            samples.overruns, self.fps, self.samples_per_second), fg='black')
+
+    def draw_figure(self, x, y, redraw):
+        for i, line in enumerate(self.lines):
+            line.set_data(x, y[:, i])
+
+        if redraw:
+            for ax in self.axes:
+                ax.set_xlim(*self.xlim)
+            # Redraw canvas (with blit, on_draw caches the new background and draws the lines)
             self.canvas.draw()
-
-            # Clear event
-            self.data_event.clear()
-
-        # Schedule the next update
-        self.root.after(int(1000/120), self.update_plot)  # 그래프는 60Hz로 업데이트
+        else:
+            self.canvas.restore_region(self.background)
+            for ax, line in zip(self.axes, self.lines):
+                ax.draw_artist(line)
+        if self.blit:
+            self.canvas.blit(self.fig.bbox)
+
+    def on_draw(self, event=None):
+        # Called after every full draw: cache everything but the lines, then put the lines back
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for ax, line in zip(self.axes, self.lines):
+            ax.draw_artist(line)
+
+    def window_limits(self, t):
+        # x limits for the newest sample time t
+        if not self.blit:
+            return (max(0, t - self.max_time) if self.max_time else 0, t)
+        if self.xlim is not None and t <= self.xlim[1]:
+            return self.xlim
+        # Jump ahead so the axes only need a full redraw once in a while
+        if self.max_time is None:
+            return (0, max(10, 1.25 * t))
+        step = self.max_time / 10
+        xmax = max(self.max_time, step * math.ceil(t / step))
+        return (xmax - self.max_time, xmax)
+
+    def plot_columns(self):
+        # Pixel columns across an axes, the most points a line can show
+        if self.chart is not None:
+            return self.chart.columns()
+        return max(int(self.axes[0].bbox.width), 1)
+
+    def set_zoom(self, label):
+        self.max_time = dict(ZOOM_LEVELS)[label]
+        self.xlim = None
+
+    def count_frame(self, sample_count):
+        self._frames += 1
+        self._frame_samples += sample_count
+        now = time.perf_counter()
+        elapsed = now - self._fps_started
+        if elapsed >= 1.0:
+            self.fps = self._frames / elapsed
+            self.samples_per_second = self._frame_samples / elapsed
+            self._frames = 0
+            self._frame_samples = 0
+            self._fps_started = now
 
     def __del__(self):
         # Stop data collector thread
         self.data_collector.running = False
         self.data_collector.join()
+        self.wakeup.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot and record TrackIR head pose")
+    parser.add_argument('--renderer', choices=('matplotlib', 'tk'), default='matplotlib',
+                        help="tk draws on a plain tk.Canvas and starts without loading matplotlib")
+    parser.add_argument('--no-blit', action='store_true', help="redraw the whole matplotlib figure every frame")
+    parser.add_argument('--synthetic', metavar='PROFILE', help="generated motion instead of the TrackIR")
+    parser.add_argument('--bus', nargs='?', const=DEFAULT_NAME, metavar='NAME',
+                        help="record the pose bus published by app/pose_server.py instead of opening the TrackIR")
+    parser.add_argument('--fields', nargs='+', choices=sorted(FIELD_GROUPS), default=['6dof'],
+                        help="what to request from the TrackIR and record, e.g. --fields 6dof raw for the raw "
+                             "imager position too (default: 6dof)")
+    args = parser.parse_args()
+
+    data_fields = 0
+    for group in args.fields:
+        data_fields |= FIELD_GROUPS[group]
+
+    source = None
+    if args.bus:
+        source = PoseBusSource(args.bus)
+    elif args.synthetic:
+        source = SyntheticSource(profile=args.synthetic)
+    Record(source, data_fields=data_fields, blit=not args.no_blit, renderer=args.renderer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# app/sprites.py
+
+from collections import OrderedDict
+
+from PIL import Image, ImageTk
+
+class SpriteCache:
+    """ Popup images pre-scaled to a fixed set of sizes, so showing one is a dictionary lookup.
+
+        A sprite's size follows its gauge ratio (0..1) like App.prepare_image did,
+        min_scale + (1 - min_scale) * ratio of the original, with the ratio rounded to one of `steps`
+        levels. With preload=True every level of every image is rendered up front (needs a Tk root);
+        otherwise levels are rendered on first use and the least recently used are evicted beyond max_size.
+
+          sprites = SpriteCache({'cw': 'images/cw.png', 'ccw': 'images/ccw.png'})
+          tk_img = sprites.get('cw', gauge_time / max_gauge_time)
+    """
+
+    def __init__(self, paths, steps=16, min_scale=0.3, preload=True, max_size=64):
+        self.steps = steps
+        self.min_scale = min_scale
+        self.max_size = max_size
+        self.images = {name: Image.open(path) for name, path in paths.items()}
+        for image in self.images.values():
+            image.load()
+        self._sprites = OrderedDict()
+        if preload:
+            self.max_size = max(max_size, len(self.images) * steps)
+            for name in self.images:
+                for level in range(1, steps + 1):
+                    self._sprite(name, level)
+
+    def level(self, ratio):
+        """ Quantized size level of a gauge ratio, 0 (nothing to show) to steps """
+        if ratio <= 0:
+            return 0
+        return min(max(round(ratio * self.steps), 1), self.steps)
+
+    def _sprite(self, name, level):
+        key = (name, level)
+        if key in self._sprites:
+            self._sprites.move_to_end(key)
+            return self._sprites[key]
+        image = self.images[name]
+        scale = self.min_scale + (1 - self.min_scale) * level / self.steps
+        w, h = image.size
+        resized = image.resize((int(w * scale), int(h * scale)), resample=Image.Resampling.LANCZOS)
+        sprite = ImageTk.PhotoImage(resized)
+        self._sprites[key] = sprite
+        while len(self._sprites) > self.max_size:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def get(self, name, ratio):
+        """ PhotoImage of image `name` for a gauge ratio, or None if the ratio is 0 """
+        level = self.level(ratio)
+        if level == 0:
+            return None
+        return self._sprite(name, level)
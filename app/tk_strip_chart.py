@@ -0,0 +1,132 @@
+# app/tk_strip_chart.py
+
+import tkinter as tk
+
+import numpy as np
+
+class TkStripChart:
+    """ Stacked strip charts drawn straight on a tk.Canvas, without matplotlib.
+
+        Same layout as Record.initialize_plots: one panel per channel with its label, fixed y limits,
+        a grid and a shared time axis at the bottom. Everything is created once; new data only moves
+        the existing polyline items with coords(), and set_xlim() only rewrites the time tick labels.
+
+          chart = TkStripChart(root, ['Roll', 'Pitch'], [(-100, 100), (-100, 100)])
+          chart.widget.pack(fill=tk.BOTH, expand=1)
+          chart.set_xlim(0, 10)
+          chart.set_data(times, values)   # values is (N, channels)
+    """
+
+    MARGIN_LEFT = 55
+    MARGIN_RIGHT = 15
+    MARGIN_TOP = 10
+    MARGIN_BOTTOM = 30
+    GAP = 18
+    X_TICKS = 5
+    Y_TICKS = 4
+
+    def __init__(self, master, labels, limits, width=800, height=900,
+                 line_color='#1f77b4', grid_color='#dddddd'):
+        self.labels = list(labels)
+        self.limits = list(limits)
+        self.line_color = line_color
+        self.grid_color = grid_color
+        self.xlim = (0.0, 10.0)
+
+        self.canvas = tk.Canvas(master, width=width, height=height, bg='white', highlightthickness=0)
+        self.widget = self.canvas
+        self.width = width
+        self.height = height
+        self.lines = [self.canvas.create_line(0, 0, 0, 0, fill=line_color, state=tk.HIDDEN)
+                      for _ in self.labels]
+        self.tick_labels = []
+        self._data = None
+        self._hidden = True
+        self._layout()
+        self.canvas.bind('<Configure>', self._on_configure)
+
+    def columns(self):
+        """ Pixel columns across a panel, the most points a line can show """
+        return max(int(self.width - self.MARGIN_LEFT - self.MARGIN_RIGHT), 1)
+
+    def _panels(self):
+        # (top, bottom) pixel rows of every panel
+        count = len(self.labels)
+        inner = self.height - self.MARGIN_TOP - self.MARGIN_BOTTOM - self.GAP * (count - 1)
+        size = max(inner / count, 1)
+        return [(self.MARGIN_TOP + i * (size + self.GAP), self.MARGIN_TOP + i * (size + self.GAP) + size)
+                for i in range(count)]
+
+    def _layout(self):
+        """ (Re)create the static items: frames, grids, labels and time ticks """
+        canvas = self.canvas
+        canvas.delete('static')
+        left = self.MARGIN_LEFT
+        right = self.width - self.MARGIN_RIGHT
+
+        for (top, bottom), label, (low, high) in zip(self._panels(), self.labels, self.limits):
+            for i in range(self.Y_TICKS + 1):
+                y = bottom - (bottom - top) * i / self.Y_TICKS
+                canvas.create_line(left, y, right, y, fill=self.grid_color, tags='static')
+                canvas.create_text(left - 4, y, text='{:g}'.format(low + (high - low) * i / self.Y_TICKS),
+                                   anchor=tk.E, font=('TkDefaultFont', 7), tags='static')
+            for i in range(1, self.X_TICKS):
+                x = left + (right - left) * i / self.X_TICKS
+                canvas.create_line(x, top, x, bottom, fill=self.grid_color, tags='static')
+            canvas.create_rectangle(left, top, right, bottom, outline='black', tags='static')
+            canvas.create_text(left + 4, top + 2, text=label, anchor=tk.NW, tags='static')
+
+        bottom = self._panels()[-1][1]
+        self.tick_labels = [canvas.create_text(left + (right - left) * i / self.X_TICKS, bottom + 4, anchor=tk.N,
+                                               font=('TkDefaultFont', 7), tags='static')
+                            for i in range(self.X_TICKS + 1)]
+        canvas.create_text((left + right) / 2, self.height - 2, text='Time (s)', anchor=tk.S, tags='static')
+        for line in self.lines:
+            canvas.tag_raise(line)
+        self._update_ticks()
+
+    def _on_configure(self, event):
+        if (event.width, event.height) == (self.width, self.height):
+            return
+        self.width = event.width
+        self.height = event.height
+        self._layout()
+        if self._data is not None:
+            self.set_data(*self._data)
+
+    def _update_ticks(self):
+        xmin, xmax = self.xlim
+        for i, item in enumerate(self.tick_labels):
+            self.canvas.itemconfig(item, text='{:.1f}'.format(xmin + (xmax - xmin) * i / self.X_TICKS))
+
+    def set_xlim(self, xmin, xmax):
+        if (xmin, xmax) == self.xlim:
+            return
+        self.xlim = (xmin, xmax)
+        self._update_ticks()
+
+    def set_data(self, x, y):
+        """ Move the lines to the samples x (N,) and y (N, channels), in data units """
+        self._data = (x, y)
+        if len(x) < 2:
+            if not self._hidden:
+                for line in self.lines:
+                    self.canvas.itemconfig(line, state=tk.HIDDEN)
+                self._hidden = True
+            return
+
+        left = self.MARGIN_LEFT
+        right = self.width - self.MARGIN_RIGHT
+        xmin, xmax = self.xlim
+        px = left + (np.asarray(x) - xmin) * ((right - left) / max(xmax - xmin, 1e-9))
+        points = np.empty((len(px), 2))
+        points[:, 0] = np.clip(px, left, right)
+
+        for i, ((top, bottom), (low, high), line) in enumerate(zip(self._panels(), self.limits, self.lines)):
+            py = bottom - (y[:, i] - low) * ((bottom - top) / (high - low))
+            points[:, 1] = np.clip(py, top, bottom)
+            self.canvas.coords(line, points.ravel().tolist())
+        if self._hidden:
+            for line in self.lines:
+                self.canvas.itemconfig(line, state=tk.NORMAL)
+            self._hidden = False
@@ -0,0 +1,87 @@
+# app/wakeup.py
+
+import time
+import threading
+import tkinter as tk
+
+class TkWakeup:
+    """ Wakes the Tk loop from another thread when new samples are ready, instead of polling with after().
+
+        notify() can be called from any thread, as often as we like, and never blocks: it only sets a
+        threading.Event. A small waker thread waits on it and posts the <<SamplesReady>> Tk event, so
+        whatever event_generate costs (it waits for the Tk thread under threaded Tcl, and fails until
+        mainloop runs) is paid there and not by the acquisition thread.
+
+        While a wakeup is pending further notifications are folded into it, so a burst of samples costs
+        one Tk event. The pending flag is cleared *before* callback runs, so a sample that arrives while
+        the callback drains triggers a new wakeup rather than getting lost.
+
+        callback runs on the Tk thread at most max_fps times a second; wakeups that come sooner are
+        delayed to the next allowed frame, independent of the acquisition rate. Call close() to stop
+        the waker thread.
+    """
+
+    EVENT = '<<SamplesReady>>'
+
+    def __init__(self, root, callback, max_fps=60):
+        self.root = root
+        self.callback = callback
+        self.min_interval = 1 / max_fps
+        self._lock = threading.Lock()
+        self._ready = threading.Event()  # 수집 스레드 -> waker 스레드
+        self._pending = False    # waker 스레드와 Tk 스레드가 공유
+        self._scheduled = False  # Tk 스레드 전용
+        self._closed = False
+        self._last_run = 0.0
+        root.bind(self.EVENT, self._on_event)
+        self._waker = threading.Thread(target=self._wake_loop, daemon=True)
+        self._waker.start()
+
+    def notify(self):
+        """ Called from the acquisition thread when there is something to show """
+        if not self._ready.is_set():
+            self._ready.set()
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+        self._waker.join()
+
+    def _wake_loop(self):
+        while True:
+            self._ready.wait()
+            if self._closed:
+                return
+            self._ready.clear()
+            with self._lock:
+                if self._pending:
+                    continue
+                self._pending = True
+            try:
+                self.root.event_generate(self.EVENT, when='tail')
+            except RuntimeError:
+                # Tk isn't running yet (or any more): try again a frame later
+                with self._lock:
+                    self._pending = False
+                self._ready.set()
+                time.sleep(self.min_interval)
+            except tk.TclError:
+                # The window is gone
+                return
+
+    def _on_event(self, event=None):
+        if self._scheduled:
+            return
+        delay = self._last_run + self.min_interval - time.perf_counter()
+        if delay > 0:
+            self._scheduled = True
+            self.root.after(int(delay * 1000) + 1, self._run)
+        else:
+            self._run()
+
+    def _run(self):
+        self._scheduled = False
+        with self._lock:
+            self._pending = False
+        self._last_run = time.perf_counter()
+        self.callback()
@@ -1,10 +1,48 @@
 # main.py
 
+import argparse
+
 #from app.app import App
-from app.app_demo import App
+from app.app_demo import App, ROBOT_ADDRESS
+from utils.pose_source import ReplaySource, SyntheticSource
+from utils.pose_bus import PoseBusSource
+from utils.filters import FILTERS, FilterStage
+from utils.trackir import YAW, PITCH
 
 def main():
-    app = App()
+    parser = argparse.ArgumentParser(description="Head motion robot control")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="replay a data/rawdata recording instead of the TrackIR: a Record session directory, "
+                             "one of its chunks, a .tirrec or a .csv file")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed (default: real time)")
+    parser.add_argument('--synthetic', metavar='PROFILE', help="generated motion instead of the TrackIR (still, sweep, gestures)")
+    parser.add_argument('--bus', nargs='?', const='trackir_pose_bus', metavar='NAME', help="read the pose bus published by app/pose_server.py")
+    parser.add_argument('--filter', choices=sorted(FILTERS), help="smooth yaw and pitch before the gesture zones")
+    parser.add_argument('--robot', metavar='HOST:PORT',
+                        help="MyCobot to drive (default: {}:{}, or none with --replay and --synthetic)".format(*ROBOT_ADDRESS))
+    parser.add_argument('--no-robot', action='store_true', help="only print the actions, even with the TrackIR")
+    args = parser.parse_args()
+
+    source = None
+    if args.replay:
+        source = ReplaySource(args.replay, speed=args.speed)
+    elif args.bus:
+        source = PoseBusSource(args.bus)
+    elif args.synthetic:
+        source = SyntheticSource(profile=args.synthetic)
+
+    pose_filter = FilterStage(FILTERS[args.filter](), axes=(YAW, PITCH)) if args.filter else None
+
+    if args.no_robot:
+        robot = None
+    elif args.robot:
+        host, port = args.robot.rsplit(':', 1)
+        robot = (host, int(port))
+    else:
+        # 재생/합성 입력으로 테스트할 때는 로봇 없이
+        robot = None if args.replay or args.synthetic else ROBOT_ADDRESS
+
+    app = App(source, pose_filter=pose_filter, robot=robot)
 
 if __name__ == "__main__":
     main()
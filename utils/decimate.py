@@ -0,0 +1,135 @@
+# utils/decimate.py
+
+""" Min/max decimation of the live plot, from seconds to a whole session.
+
+    A line can't show more than one value per pixel column anyway, so before anything reaches a line
+    artist a window is reduced to the min and max of every column (minmax_envelope). Drawn as
+    min, max, min, max, ... the line looks the same as with every sample, spikes included, but the
+    render cost depends on the plot width instead of the window length.
+
+    Decimator keeps the recent raw samples plus running min/max summaries in coarser and coarser time
+    buckets, so a window of an hour is reduced from a few thousand buckets instead of 432000 samples:
+
+      decimator = Decimator(6)
+      decimator.extend(times, poses)
+      x, y = decimator.window(t0, t1, columns=800)   # x (2 * columns,), y (2 * columns, 6)
+"""
+import numpy as np
+
+from utils.history import History
+
+def minmax_envelope(times, mins, maxs, t0, t1, columns):
+    """ Reduce samples to the min and max of each of `columns` equal time bins of [t0, t1).
+
+        times must be sorted; mins and maxs are (N, channels) (the same array for raw samples).
+        Returns x (2 * M,) and y (2 * M, channels) for the M columns that have data, with every column's
+        min and max at its center
+    """
+    channels = mins.shape[1]
+    begin, end = np.searchsorted(times, (t0, t1))
+    if end <= begin or t1 <= t0:
+        return np.empty(0), np.empty((0, channels))
+    width = (t1 - t0) / columns
+    column = ((times[begin:end] - t0) / width).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(column)) + 1))
+
+    x = np.repeat(t0 + (column[starts] + 0.5) * width, 2)
+    y = np.empty((2 * len(starts), channels), dtype=np.result_type(mins, maxs))
+    y[0::2] = np.minimum.reduceat(mins[begin:end], starts, axis=0)
+    y[1::2] = np.maximum.reduceat(maxs[begin:end], starts, axis=0)
+    return x, y
+
+class SummaryLevel:
+    """ Running min/max of every `bucket` seconds of a stream, for the whole session.
+
+        The newest bucket is updated in place until a sample falls into the next one.
+    """
+
+    def __init__(self, bucket, channels, dtype=np.float32):
+        self.bucket = bucket
+        self.count = 0
+        self._ids = np.zeros(1024, dtype=np.int64)
+        self._mins = np.zeros((1024, channels), dtype=dtype)
+        self._maxs = np.zeros((1024, channels), dtype=dtype)
+
+    @property
+    def times(self):
+        """ Center time of every bucket """
+        return (self._ids[:self.count] + 0.5) * self.bucket
+
+    @property
+    def mins(self):
+        return self._mins[:self.count]
+
+    @property
+    def maxs(self):
+        return self._maxs[:self.count]
+
+    def clear(self):
+        self.count = 0
+
+    def extend(self, times, mins, maxs):
+        if len(times) == 0:
+            return
+        ids = np.floor(times / self.bucket).astype(np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        ids = ids[starts]
+        mins = np.minimum.reduceat(mins, starts, axis=0)
+        maxs = np.maximum.reduceat(maxs, starts, axis=0)
+
+        if self.count and ids[0] == self._ids[self.count - 1]:
+            # Still the bucket we were filling
+            last = self.count - 1
+            np.minimum(self._mins[last], mins[0], out=self._mins[last])
+            np.maximum(self._maxs[last], maxs[0], out=self._maxs[last])
+            ids, mins, maxs = ids[1:], mins[1:], maxs[1:]
+
+        end = self.count + len(ids)
+        if end > len(self._ids):
+            size = max(end, 2 * len(self._ids))
+            self._ids = np.resize(self._ids, size)
+            self._mins = np.resize(self._mins, (size, self._mins.shape[1]))
+            self._maxs = np.resize(self._maxs, (size, self._maxs.shape[1]))
+        self._ids[self.count:end] = ids
+        self._mins[self.count:end] = mins
+        self._maxs[self.count:end] = maxs
+        self.count = end
+
+class Decimator:
+    """ Recent raw samples plus SummaryLevels, reduced to min/max envelopes for any window.
+
+        raw_points is how many raw samples are kept (`raw` is a History of time + channels).
+        window() uses the coarsest data that still has at least one sample or bucket per column:
+        the raw samples while the window is short and recent, then summaries of `buckets` seconds.
+    """
+
+    def __init__(self, channels, raw_points=7200, buckets=(0.1, 1.0, 10.0)):
+        self.channels = channels
+        self.raw = History(raw_points, channels + 1)
+        self.levels = [SummaryLevel(bucket, channels) for bucket in sorted(buckets)]
+
+    def clear(self):
+        self.raw.clear()
+        for level in self.levels:
+            level.clear()
+
+    def extend(self, times, values):
+        """ Add a batch of samples: times (N,) and values (N, channels) """
+        if len(times) == 0:
+            return
+        self.raw.extend(np.column_stack((times, values)))
+        for level in self.levels:
+            level.extend(times, values, values)
+
+    def window(self, t0, t1, columns):
+        """ Min/max envelope of [t0, t1) at `columns` columns, as (x, y) for Line2D.set_data """
+        width = (t1 - t0) / max(columns, 1)
+        raw = self.raw.view()
+        if len(raw) and (raw[0, 0] <= t0 or len(raw) < self.raw.capacity) and width < self.levels[0].bucket:
+            return minmax_envelope(raw[:, 0], raw[:, 1:], raw[:, 1:], t0, t1, columns)
+
+        level = self.levels[0]
+        for candidate in self.levels:
+            if candidate.bucket <= width:
+                level = candidate
+        return minmax_envelope(level.times, level.mins, level.maxs, t0, t1, columns)
@@ -0,0 +1,200 @@
+# utils/filters.py
+
+""" Streaming smoothing filters for head pose, applied to whole drained batches.
+
+      pose_filter = FilterStage(OneEuroFilter(min_cutoff=1.0, beta=0.05), axes=(YAW, PITCH))
+      samples = pose_filter.process(times, samples)   # (N, 6), only yaw and pitch are filtered
+      pose_filter.latency()                           # added lag in seconds, measured on a ramp
+
+    Every filter keeps its state between process() calls, so feeding a recording in batches of any
+    size gives the same result as feeding it in one go. Filters work on all columns of what they're
+    given at once and loop over nothing per sample in Python.
+
+      EmaFilter      - first order low pass at `cutoff` Hz, using the real time between samples
+      OneEuroFilter  - low pass whose cutoff rises with speed: smooth when still, responsive when moving
+      MedianFilter   - median of the last `window` samples, removes spikes without smearing edges
+"""
+import copy
+
+import numpy as np
+
+# EMA batches are evaluated in closed form in pieces whose decay stays above exp(-_MAX_DECAY),
+# so the 1 / decay factors don't lose precision
+_MAX_DECAY = 18.0
+
+def _alpha(cutoff, dt):
+    """ Smoothing factor of a first order low pass at cutoff Hz for a step of dt seconds """
+    return -np.expm1(-2 * np.pi * cutoff * dt)
+
+def ema_scan(values, alphas, initial):
+    """ y[i] = y[i-1] + alphas[i] * (values[i] - y[i-1]) with y[-1] = initial, without a Python loop.
+
+        values and alphas are (N, C) (alphas may also be (N, 1)), initial is (C,). Uses
+        y[i] = P[i] * (initial + sum_k<=i alphas[k] * values[k] / P[k]) with P[i] = prod_k<=i (1 - alphas[k]),
+        split wherever P would get too small to divide by.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    alphas = np.broadcast_to(np.asarray(alphas, dtype=np.float64), values.shape)
+    log_keep = np.log1p(-np.minimum(alphas, 1 - 1e-12))
+    # Piece boundaries from the fastest decaying channel, so every channel stays within _MAX_DECAY
+    worst = -np.cumsum(log_keep.min(axis=1))
+    out = np.empty_like(values)
+    y = np.asarray(initial, dtype=np.float64)
+    start = 0
+    while start < len(values):
+        base = worst[start - 1] if start else 0.0
+        end = max(int(np.searchsorted(worst, base + _MAX_DECAY, side='right')), start + 1)
+        decay = np.exp(np.cumsum(log_keep[start:end], axis=0))
+        piece = decay * (y + np.cumsum(alphas[start:end] * values[start:end] / decay, axis=0))
+        out[start:end] = piece
+        y = piece[-1]
+        start = end
+    return out
+
+class PoseFilter:
+    """ Interface of a streaming filter over (N, C) batches """
+
+    def process(self, times: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """ Filter a batch of samples taken at times (seconds, ascending). Returns a new (N, C) array """
+        raise NotImplementedError
+
+    def reset(self):
+        """ Forget everything seen so far """
+        raise NotImplementedError
+
+    def latency(self, rate=120.0, slope=30.0, seconds=3.0) -> float:
+        """ Added lag in seconds: how far behind a ramp of `slope` units/s the output settles,
+            sampled at `rate` Hz. Measured on a fresh copy, so the filter's own state is untouched
+        """
+        probe = copy.deepcopy(self)
+        probe.reset()
+        times = np.arange(int(seconds * rate)) / rate
+        ramp = (slope * times)[:, np.newaxis]
+        out = probe.process(times, ramp)
+        tail = len(times) // 2
+        return float(np.mean(ramp[tail:, 0] - out[tail:, 0]) / slope)
+
+class EmaFilter(PoseFilter):
+    """ Exponential moving average with a time constant instead of a per-sample weight:
+        alpha = 1 - exp(-2 pi cutoff dt), so the smoothing is the same at any sample rate.
+    """
+
+    def __init__(self, cutoff=5.0):
+        self.cutoff = cutoff
+        self.reset()
+
+    def reset(self):
+        self.last_time = None
+        self.last_value = None
+
+    def process(self, times, values):
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(times) == 0:
+            return values.copy()
+        if self.last_time is None:
+            # Start at the first sample instead of easing in from zero
+            self.last_time = times[0]
+            self.last_value = values[0]
+        dt = np.diff(np.concatenate(([self.last_time], times)))
+        out = ema_scan(values, _alpha(self.cutoff, dt)[:, np.newaxis], self.last_value)
+        self.last_time = times[-1]
+        self.last_value = out[-1]
+        return out
+
+class OneEuroFilter(PoseFilter):
+    """ The 1 euro filter (Casiez et al. 2012): an EMA whose cutoff is min_cutoff + beta * |speed|,
+        with the speed itself smoothed at d_cutoff Hz. Raise beta to cut lag during fast motion,
+        lower min_cutoff to remove more jitter when still.
+
+        The speed is estimated from the raw samples rather than the previous output, which makes the
+        whole batch computable with two EMA scans and no per-sample loop.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.last_time = None
+        self.last_raw = None
+        self.last_value = None
+        self.last_speed = None
+
+    def process(self, times, values):
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(times) == 0:
+            return values.copy()
+        if self.last_time is None:
+            self.last_time = times[0]
+            self.last_raw = values[0]
+            self.last_value = values[0]
+            self.last_speed = np.zeros(values.shape[1])
+
+        dt = np.diff(np.concatenate(([self.last_time], times)))
+        raw = np.concatenate((self.last_raw[np.newaxis], values))
+        safe_dt = np.where(dt > 0, dt, np.inf)[:, np.newaxis]
+        speed = ema_scan(np.diff(raw, axis=0) / safe_dt, _alpha(self.d_cutoff, dt)[:, np.newaxis], self.last_speed)
+        cutoff = self.min_cutoff + self.beta * np.abs(speed)
+        out = ema_scan(values, _alpha(cutoff, dt[:, np.newaxis]), self.last_value)
+
+        self.last_time = times[-1]
+        self.last_raw = values[-1]
+        self.last_value = out[-1]
+        self.last_speed = speed[-1]
+        return out
+
+class MedianFilter(PoseFilter):
+    """ Median of the last `window` samples (including the current one) """
+
+    def __init__(self, window=5):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.previous = None  # the last window - 1 samples
+
+    def process(self, times, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return values.copy()
+        if self.previous is None:
+            # Pad with the first sample so the first outputs don't lean towards zero
+            self.previous = np.repeat(values[:1], self.window - 1, axis=0)
+        padded = np.concatenate((self.previous, values))
+        windows = np.lib.stride_tricks.sliding_window_view(padded, self.window, axis=0)
+        out = np.median(windows, axis=-1)
+        self.previous = padded[len(padded) - (self.window - 1):] if self.window > 1 else padded[:0]
+        return out
+
+# name -> filter class, for command line options
+FILTERS = {
+    'ema': EmaFilter,
+    'one_euro': OneEuroFilter,
+    'median': MedianFilter,
+}
+
+class FilterStage:
+    """ Applies a PoseFilter to some columns of the (N, 6) pose batches from DataCollector.drain_samples,
+        leaving the others as they are. axes=None filters all of them.
+    """
+
+    def __init__(self, pose_filter, axes=None):
+        self.filter = pose_filter
+        self.axes = list(axes) if axes is not None else None
+
+    def process(self, times, samples):
+        if self.axes is None:
+            return self.filter.process(times, samples)
+        out = np.array(samples, dtype=np.float64)
+        out[:, self.axes] = self.filter.process(times, out[:, self.axes])
+        return out
+
+    def reset(self):
+        self.filter.reset()
+
+    def latency(self, rate=120.0):
+        return self.filter.latency(rate)
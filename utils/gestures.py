@@ -0,0 +1,146 @@
+# utils/gestures.py
+
+""" Dwell gestures on any of the six DOF, driven by a table of rules.
+
+    A rule is a closed interval on one axis. Holding the head inside it for `dwell` seconds starts
+    filling its gauge (in seconds, up to max_gauge), and leaving it emits the rule's action with the
+    gauge value reached:
+
+      engine = GestureEngine([
+          GestureRule(YAW, 15, 25, 1.0, 'yaw_left'),
+          GestureRule(YAW, -30, -20, 1.0, 'yaw_right'),
+          GestureRule(PITCH, 5, 15, 1.0, 'pitch_down'),
+      ])
+      for event in engine.process(times, samples):   # samples is (N, 6), see DataCollector.drain_samples
+          print(event.action, event.gauge)
+
+    default_rules() builds the rules of the HUD's four zones (DEFAULT_ZONES), which app/app_up.py,
+    app/app_demo.py and app/evaluate.py all use.
+
+    The rules of an axis must not overlap; each axis is in at most one zone at a time.
+    process() looks up the zone of every sample of a batch at once (searchsorted over the sorted
+    intervals of each axis) and only runs Python code per zone change, so more rules or axes
+    don't add per-sample work.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from utils.trackir import YAW, PITCH
+
+GestureRule = namedtuple('GestureRule', ['axis', 'low', 'high', 'dwell', 'action'])
+GestureEvent = namedtuple('GestureEvent', ['time', 'action', 'gauge', 'rule'])
+
+# The HUD's zones in degrees, action -> (axis, low, high)
+DEFAULT_ZONES = {
+    'yaw_left': (YAW, 15.0, 25.0),      # CW rotate
+    'yaw_right': (YAW, -30.0, -20.0),   # CCW rotate
+    'pitch_down': (PITCH, 5.0, 15.0),   # Forward
+    'pitch_up': (PITCH, -15.0, -5.0),   # Backward
+}
+DEFAULT_DWELL = 1.0
+DEFAULT_MAX_GAUGE = 4.0
+
+def default_rules(dwell=DEFAULT_DWELL, **zones):
+    """ GestureRules of DEFAULT_ZONES. Zones can be moved by action name, e.g.
+        default_rules(0.8, yaw_left=(12, 25))
+    """
+    for action in zones:
+        if action not in DEFAULT_ZONES:
+            raise ValueError("Unknown gesture zone {}".format(action))
+    return [GestureRule(axis, *zones.get(action, (low, high)), dwell, action)
+            for action, (axis, low, high) in DEFAULT_ZONES.items()]
+
+class _Axis:
+    """ The rules of one axis, sorted by interval, and where that axis is now """
+
+    def __init__(self, axis, rules):
+        rules = sorted(rules, key=lambda rule: rule.low)
+        for previous, rule in zip(rules, rules[1:]):
+            if rule.low <= previous.high:
+                raise ValueError("Gesture zones {} and {} overlap".format(previous.action, rule.action))
+        self.axis = axis
+        self.rules = rules
+        self.lows = np.array([rule.low for rule in rules], dtype=np.float64)
+        self.highs = np.array([rule.high for rule in rules], dtype=np.float64)
+        self.zone = -1         # index into rules, -1 outside every zone
+        self.enter_time = None
+        self.gauge = 0.0
+
+    def zones(self, values):
+        """ Zone index of every value, -1 where it's in none """
+        index = np.searchsorted(self.lows, values, side='right') - 1
+        inside = (index >= 0) & (values <= self.highs[np.maximum(index, 0)])
+        return np.where(inside, index, -1)
+
+class GestureEngine:
+    """ Runs GestureRules over batches of samples.
+
+        The gauge is the time spent in the zone past the rule's dwell, measured on the sample timestamps:
+        clip(t - enter_time - dwell, 0, max_gauge) at the latest sample t in the zone. That is exact
+        whatever the sample rate, and repeated or dropped frames don't speed it up or slow it down.
+        On leaving the zone (to no zone or another one) a GestureEvent is emitted with the gauge at the
+        last sample inside, and the gauge starts over.
+    """
+
+    def __init__(self, rules, max_gauge=4.0):
+        self.rules = list(rules)
+        self.max_gauge = max_gauge
+        by_axis = {}
+        for rule in self.rules:
+            by_axis.setdefault(rule.axis, []).append(rule)
+        self.axes = {axis: _Axis(axis, axis_rules) for axis, axis_rules in by_axis.items()}
+
+    def reset(self):
+        for state in self.axes.values():
+            state.zone = -1
+            state.enter_time = None
+            state.gauge = 0.0
+
+    def active(self, axis):
+        """ The rule whose zone the axis is in, or None """
+        state = self.axes.get(axis)
+        if state is None or state.zone < 0:
+            return None
+        return state.rules[state.zone]
+
+    def gauge(self, axis):
+        """ Gauge of the zone the axis is in (0 outside every zone) """
+        state = self.axes.get(axis)
+        return state.gauge if state is not None else 0.0
+
+    def process(self, times, samples):
+        """ Feed a batch of samples taken at times (seconds, ascending), samples (N, 6).
+            Returns the GestureEvents of zones left during the batch, in time order
+        """
+        times = np.asarray(times, dtype=np.float64)
+        events = []
+        if len(times) == 0:
+            return events
+        for state in self.axes.values():
+            self._process_axis(state, times, samples[:, state.axis], events)
+        events.sort(key=lambda event: event.time)
+        return events
+
+    def _process_axis(self, state, times, values, events):
+        zones = state.zones(values)
+        # Runs of samples in the same zone; the first run continues the zone we were in
+        starts = np.flatnonzero(np.diff(zones)) + 1
+        bounds = np.concatenate(([0], starts, [len(zones)]))
+        for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            zone = int(zones[begin])
+            if zone != state.zone:
+                if state.zone >= 0:
+                    rule = state.rules[state.zone]
+                    events.append(GestureEvent(float(times[begin]), rule.action, state.gauge, rule))
+                state.zone = zone
+                state.enter_time = float(times[begin]) if zone >= 0 else None
+                state.gauge = 0.0
+            if zone < 0:
+                continue
+            self._fill_gauge(state, times[begin:end])
+
+    def _fill_gauge(self, state, times):
+        # Closed form in the time of the newest sample, so a run costs the same however long it is
+        held = float(times[-1]) - state.enter_time - state.rules[state.zone].dwell
+        state.gauge = min(max(held, 0.0), self.max_gauge)
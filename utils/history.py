@@ -0,0 +1,55 @@
+# utils/history.py
+
+import numpy as np
+
+class History:
+    """ The last `capacity` rows of a (N, columns) float stream, for plotting.
+
+        Every row is written twice, at i and i + capacity of a (2 * capacity, columns) buffer, so the
+        newest `capacity` rows are always one contiguous slice: view() is O(1) and returns a view,
+        not a copy, and extend() costs the same however long the window is.
+
+          history = History(1200, 7)
+          history.extend(np.column_stack((times, poses)))
+          rows = history.view()   # oldest first, valid until the next extend()
+    """
+
+    def __init__(self, capacity, columns, dtype=np.float64):
+        self.capacity = capacity
+        self.buffer = np.zeros((2 * capacity, columns), dtype=dtype)
+        self.head = 0  # rows written since the start (or clear())
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+    def clear(self):
+        self.head = 0
+
+    def extend(self, rows):
+        """ Append a (N, columns) block of rows """
+        rows = np.asarray(rows)
+        if len(rows) > self.capacity:
+            self.head += len(rows) - self.capacity
+            rows = rows[-self.capacity:]
+        start = self.head % self.capacity
+        first = min(len(rows), self.capacity - start)
+        # rows that fit before the end of the ring, then the ones that wrap to the front
+        for begin, end, at in ((0, first, start), (first, len(rows), 0)):
+            if end > begin:
+                self.buffer[at:at + end - begin] = rows[begin:end]
+                self.buffer[at + self.capacity:at + self.capacity + end - begin] = rows[begin:end]
+        self.head += len(rows)
+
+    def append(self, row):
+        self.extend(np.asarray(row)[np.newaxis])
+
+    def view(self) -> np.ndarray:
+        """ The rows in the window, oldest first, as a view into the buffer """
+        end = self.head % self.capacity + self.capacity
+        return self.buffer[end - len(self):end]
+
+    def last(self):
+        """ The newest row, or None before the first extend() """
+        if self.head == 0:
+            return None
+        return self.view()[-1]
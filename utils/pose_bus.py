@@ -0,0 +1,153 @@
+# utils/pose_bus.py
+
+""" A shared memory ring buffer to share one TrackIR stream between processes.
+
+    One acquisition process (app/pose_server.py) owns the TrackIR session and publishes every new
+    frame with PoseBusPublisher. Any number of processes attach with PoseBusSubscriber and read the
+    samples straight out of the shared memory, without copies or locks:
+
+      bus = PoseBusSubscriber()
+      while True:
+         samples = bus.read()   # SAMPLE_DTYPE records published since the last read()
+
+    PoseBusSource wraps a subscriber as a PoseSource, so the apps can run from the bus instead of the camera.
+
+    Layout of the shared memory block: a 64 byte header (magic, capacity, sequence number) followed by
+    `capacity` SAMPLE_DTYPE records. The publisher writes record seq % capacity and only then increments
+    seq, so everything below seq is complete. A subscriber that falls more than `capacity` records behind
+    skips ahead and counts the records it lost in `overruns`.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.trackir import SAMPLE_DTYPE, POSE_FIELDS, NP_OK, NP_ERR_NO_DATA
+from utils.pose_source import PoseSource
+
+DEFAULT_NAME = 'trackir_pose_bus'
+MAGIC = 0x54495242  # 'TIRB'
+HEADER_SIZE = 64
+_HEADER_DTYPE = np.dtype([('magic', '<u4'), ('capacity', '<u4'), ('seq', '<u8')])
+
+class PoseBusPublisher:
+    """ Creates the shared memory block and publishes samples into it. There must only be one per name """
+
+    def __init__(self, name=DEFAULT_NAME, capacity=4096):
+        size = HEADER_SIZE + capacity * SAMPLE_DTYPE.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=self.shm.buf)
+        self.records = np.ndarray((capacity,), dtype=SAMPLE_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self.capacity = capacity
+        self.seq = 0
+        self.header['capacity'] = capacity
+        self.header['seq'] = 0
+        self.header['magic'] = MAGIC
+
+    def publish(self, timestamp, data):
+        """ Publish one TrackIR_6DOF_Data sample taken at timestamp (time.perf_counter()) """
+        self.records[self.seq % self.capacity] = (timestamp, data.frame, data.status,
+                                                   data.roll, data.pitch, data.yaw, data.x, data.y, data.z)
+        self.seq += 1
+        self.header['seq'] = self.seq
+
+    def close(self):
+        del self.header, self.records
+        self.shm.close()
+        self.shm.unlink()
+
+class PoseBusSubscriber:
+    """ Attaches to a publisher's shared memory block and reads the samples published after attaching """
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = shared_memory.SharedMemory(name=name)
+        try:
+            # Before Python 3.13 attaching registers the block with the resource tracker, which would
+            # unlink it from under the publisher when this process exits
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except Exception:
+            pass
+        self.header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=self.shm.buf)
+        if self.header['magic'] != MAGIC:
+            raise Exception("{} is not a pose bus".format(name))
+        self.capacity = int(self.header['capacity'])
+        self.records = np.ndarray((self.capacity,), dtype=SAMPLE_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self.next_seq = int(self.header['seq'])
+        self.overruns = 0
+
+    @property
+    def seq(self):
+        """ Number of samples published so far """
+        return int(self.header['seq'])
+
+    def read(self, max_count=None):
+        """ Return the samples published since the last read() as a read-only view into shared memory.
+
+            When the new samples wrap around the end of the ring only the part up to the end is returned,
+            and the rest comes with the next call. The view is only valid until the publisher laps it,
+            so use or copy it right away.
+        """
+        seq = self.seq
+        if seq - self.next_seq > self.capacity:
+            self.overruns += seq - self.capacity - self.next_seq
+            self.next_seq = seq - self.capacity
+        start = self.next_seq % self.capacity
+        count = min(seq - self.next_seq, self.capacity - start)
+        if max_count is not None:
+            count = min(count, max_count)
+        self.next_seq += count
+        view = self.records[start:start + count]
+        view.flags.writeable = False
+        return view
+
+    def latest(self):
+        """ Return a copy of the most recent sample, or None if nothing has been published yet """
+        seq = self.seq
+        if seq == 0:
+            return None
+        return self.records[(seq - 1) % self.capacity].copy()
+
+    def close(self):
+        del self.header, self.records
+        self.shm.close()
+
+class PoseBusSource(PoseSource):
+    """ A PoseSource on the pose bus.
+
+        It is batched: DataCollector takes every published sample with read_samples(), with the
+        publisher's timestamps, so a collector that polls late still gets the whole stream.
+        get_data() returns just the latest sample.
+    """
+
+    batched = True
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.subscriber = PoseBusSubscriber(name)
+
+    def read_samples(self):
+        # read() stops at the end of the ring, so a wrapped batch takes two calls. Copied, because the
+        # views are only good until the publisher laps them
+        parts = []
+        while True:
+            view = self.subscriber.read()
+            if len(view) == 0:
+                break
+            parts.append(view)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=SAMPLE_DTYPE)
+
+    def get_data(self, out=None):
+        sample = self.subscriber.latest()
+        if sample is None:
+            out = self._fill(out, 0, (0.0,) * 6)
+            out.status = NP_ERR_NO_DATA
+            return out
+        out = self._fill(out, int(sample['frame']), [sample[name] for name in POSE_FIELDS])
+        out.status = sample['status']
+        return out
+
+    def poll(self, out):
+        self.get_data(out)
+        return NP_ERR_NO_DATA if self.subscriber.seq == 0 else NP_OK
+
+    def close(self):
+        self.subscriber.close()
@@ -0,0 +1,188 @@
+# utils/pose_source.py
+
+""" Sources of 6 DOF head pose samples.
+
+    Everything that polls for head pose (DataCollector and the apps) talks to a PoseSource.
+    TrackIRWrapper reads the real camera, and the sources in this module let the apps, the HUD and the
+    gesture logic run without one, e.g. on Linux or in CI:
+
+      ReplaySource('data/rawdata/session_20240101_120000', speed=4)  # replay a Record session at 4x
+      SyntheticSource(rate=120, profile='gestures')                  # generated motion
+
+    Every source fills the same TrackIR_6DOF_Data struct the DLL does (raw units and frame counter),
+    so the rest of the pipeline can't tell them apart.
+"""
+import math
+import time
+
+import numpy as np
+
+from utils.trackir import TrackIR_6DOF_Data, NP_OK, NPFIELDS_6DOF, POSE_FIELDS
+from utils.reader import open_recording
+
+def _to_short(n: int) -> int:
+    """ Wrap a frame number the way the DLL's 16 bit frame counter does """
+    return ((n + 32768) & 0xFFFF) - 32768
+
+class PoseSource:
+    """ Interface of a head pose source """
+
+    # NP_RequestData bitfield of the fields this source fills in
+    data_fields = NPFIELDS_6DOF
+    # True if the source hands over whole batches of timestamped samples with read_samples(),
+    # which DataCollector then uses instead of poll()
+    batched = False
+
+    def get_data(self, out: TrackIR_6DOF_Data = None) -> TrackIR_6DOF_Data:
+        """ Return the latest sample, written into out if given (see DataCollector) """
+        raise NotImplementedError
+
+    def poll(self, out: TrackIR_6DOF_Data) -> int:
+        """ Fill out with the latest sample and return a DLL status code (NP_OK, NP_ERR_NO_DATA, ...)
+            instead of raising. This is what DataCollector calls
+        """
+        self.get_data(out)
+        return NP_OK
+
+    def read_samples(self) -> np.ndarray:
+        """ Every sample that arrived since the last call, as SAMPLE_DTYPE records (only if batched) """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _fill(self, out, frame, pose):
+        if out is None:
+            out = TrackIR_6DOF_Data()
+        out.status = 0
+        out.frame = _to_short(frame)
+        out.set_pose(*pose)
+        return out
+
+class ReplaySource(PoseSource):
+    """ Replays a recording written by app/record.py: a session directory, one of its chunks, a .tirrec
+        file or a Frame,Roll,Pitch,Yaw,X,Y,Z CSV file (anything utils.reader.open_recording opens).
+        Pose fields missing from the recording read as 0.
+
+        CSV files have no timestamps, so sample times are derived from the (unwrapped) frame counter at
+        `rate` frames per second. That keeps gaps from dropped frames in the replay.
+        Sessions and .tirrec files carry the monotonic time of every sample, which is used as is.
+
+        speed is the replay speed relative to real time. With speed=None every get_data() call returns
+        the next row, which makes runs deterministic and as fast as the consumer can go.
+        At the end of the file it starts over if loop is set, otherwise it keeps returning the last frame.
+    """
+
+    def __init__(self, path, speed=1.0, rate=120.0, loop=False):
+        with open_recording(path, rate=rate) as recording:
+            records = recording.window(0.0, np.inf)
+        if len(records) == 0:
+            raise ValueError("No samples in {}".format(path))
+        zeros = np.zeros(len(records))
+        rows = np.column_stack([records['frame']] + [records[name] if name in records.dtype.names else zeros
+                                                     for name in POSE_FIELDS]).astype(float)
+        times = records['time']
+
+        steps = (np.diff(rows[:, 0].astype(np.int64)) & 0xFFFF)
+        self.frames = np.concatenate(([0], np.cumsum(steps))) + int(rows[0, 0])
+        self.times = np.asarray(times, dtype=np.float64)
+        self.poses = rows[:, 1:7]
+        self.speed = speed
+        self.loop = loop
+        self.index = -1
+        self.start_time = None
+
+    @property
+    def duration(self):
+        return self.times[-1]
+
+    def _next_index(self):
+        if self.speed is None:
+            index = self.index + 1
+            if index >= len(self.poses):
+                index = 0 if self.loop else len(self.poses) - 1
+            return index
+
+        now = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = now
+        elapsed = (now - self.start_time) * self.speed
+        if self.loop and self.duration > 0:
+            elapsed %= self.duration
+        return max(int(np.searchsorted(self.times, elapsed, side='right')) - 1, 0)
+
+    def get_data(self, out=None):
+        self.index = self._next_index()
+        return self._fill(out, int(self.frames[self.index]), self.poses[self.index])
+
+def _still(t):
+    return (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+def _sweep(t):
+    # 느린 좌우/상하 스윕
+    return (2 * math.sin(2 * math.pi * t / 11),
+            20 * math.sin(2 * math.pi * t / 5),
+            35 * math.sin(2 * math.pi * t / 8),
+            5 * math.sin(2 * math.pi * t / 13),
+            5 * math.sin(2 * math.pi * t / 17),
+            5 * math.sin(2 * math.pi * t / 19))
+
+# (duration, yaw, pitch) steps that dwell in each of the HUD gesture zones in turn
+_GESTURE_STEPS = [
+    (1.0, 0, 0), (3.0, 20, 0),
+    (1.0, 0, 0), (3.0, -25, 0),
+    (1.0, 0, 0), (3.0, 0, 10),
+    (1.0, 0, 0), (3.0, 0, -10),
+]
+_GESTURE_PERIOD = sum(step[0] for step in _GESTURE_STEPS)
+
+def _gestures(t):
+    t %= _GESTURE_PERIOD
+    for duration, yaw, pitch in _GESTURE_STEPS:
+        if t < duration:
+            break
+        t -= duration
+    return (0.0, pitch, yaw, 0.0, 0.0, 0.0)
+
+PROFILES = {
+    'still': _still,
+    'sweep': _sweep,
+    'gestures': _gestures,
+}
+
+class SyntheticSource(PoseSource):
+    """ Generates head motion at `rate` frames per second.
+
+        profile is one of the names in PROFILES, or a function of time (seconds) returning
+        (roll, pitch, yaw, x, y, z). noise adds gaussian noise with that standard deviation (seeded by seed).
+
+        With realtime=True frames follow the wall clock like the camera does, so polling faster than
+        `rate` sees repeated frames. With realtime=False every get_data() call returns the next frame,
+        which is deterministic and runs as fast as the consumer can go.
+    """
+
+    def __init__(self, rate=120.0, profile='sweep', noise=0.0, seed=0, realtime=True):
+        self.rate = rate
+        self.profile = PROFILES[profile] if isinstance(profile, str) else profile
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.realtime = realtime
+        self.frame = -1
+        self.start_time = None
+
+    def get_data(self, out=None):
+        if self.realtime:
+            now = time.perf_counter()
+            if self.start_time is None:
+                self.start_time = now
+            frame = int((now - self.start_time) * self.rate)
+        else:
+            frame = self.frame + 1
+
+        if frame != self.frame:
+            self.frame = frame
+            pose = self.profile(frame / self.rate)
+            if self.noise:
+                pose = np.add(pose, self.rng.normal(0.0, self.noise, 6))
+            self._pose = pose
+        return self._fill(out, self.frame, self._pose)
@@ -0,0 +1,341 @@
+# utils/reader.py
+
+""" Random access to recordings by time or frame, without loading them.
+
+      recording = open_recording('data/rawdata/session_20240101_120000')
+      records = recording.window(3600.0, 3610.0)   # 10 s, one hour in
+      records = recording.frames(0, 1200)          # the first 1200 camera frames
+
+    Works on .tirrec files, single session chunks (.tirrec.xz, .tirrec.zlib), session directories
+    (see utils/session.py) and the old Frame,Roll,Pitch,Yaw,X,Y,Z CSV files. Every reader returns
+    sample_dtype(fields) arrays, with `time` in seconds since the first sample of the recording, and
+    counts frames from the first sample with the 16 bit wraparound of the frame counter taken out.
+
+    Files are memory mapped and indexed sparsely: every INDEX_STRIDE-th sample's time, unwrapped frame
+    and (for CSV) byte offset. A lookup searches the index and then a single stride of samples, so a
+    window costs about the same anywhere in the file. Building the index of a file reads it once;
+    the index is cached next to it as <file>.idx.npz and rebuilt when the file changes.
+    Session directories need no index file, since the manifest already has the time range of every chunk.
+"""
+import io
+import mmap
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.trackir import FIELDS, sample_dtype
+from utils.session import MANIFEST, read_manifest, read_chunk, read_chunk_file, chunk_codec
+
+INDEX_STRIDE = 1024
+INDEX_SUFFIX = '.idx.npz'
+_BLOCK_SIZE = 1 << 20  # records per pass when building an index
+_CSV_BLOCK_BYTES = 1 << 24  # CSV bytes per pass when building an index
+
+_FIELDS_BY_LABEL = {field[4]: field[0] for field in FIELDS}
+
+def unwrap_frames(frames: np.ndarray, first: int = 0) -> np.ndarray:
+    """ 16 bit frame counter values as a count that keeps going up, starting at first """
+    out = np.empty(len(frames), dtype=np.int64)
+    if len(frames):
+        out[0] = 0
+        np.cumsum(np.diff(frames.astype(np.int64)) & 0xFFFF, out=out[1:])
+        out += first
+    return out
+
+def _blocks(index_keys, start, stop):
+    """ Range of index blocks [b0, b1) that holds every sample with start <= key < stop """
+    b0 = max(int(np.searchsorted(index_keys, start, side='right')) - 1, 0)
+    b1 = int(np.searchsorted(index_keys, stop, side='left'))
+    return b0, max(b1, b0)
+
+def _load_index(path, stride):
+    """ Cached index arrays of path, or None if there is none or the file changed since """
+    try:
+        stat = os.stat(path)
+        with np.load(path + INDEX_SUFFIX) as cached:
+            if (int(cached['size']) == stat.st_size and int(cached['mtime']) == stat.st_mtime_ns
+                    and int(cached['stride']) == stride):
+                return {name: cached[name] for name in cached.files}
+    except (OSError, KeyError, ValueError):
+        pass
+    return None
+
+def _save_index(path, stride, **arrays):
+    stat = os.stat(path)
+    try:
+        with open(path + INDEX_SUFFIX, 'wb') as f:
+            np.savez(f, size=stat.st_size, mtime=stat.st_mtime_ns, stride=stride, **arrays)
+    except OSError:
+        # 읽기 전용 위치면 캐시 없이 사용
+        pass
+
+class RecordingReader:
+    """ Interface of the readers returned by open_recording() """
+
+    fields = ()
+    duration = 0.0
+
+    def window(self, start: float, stop: float) -> np.ndarray:
+        """ Samples with start <= time < stop (seconds since the first sample) """
+        raise NotImplementedError
+
+    def frames(self, start: int, stop: int) -> np.ndarray:
+        """ Samples with start <= frame < stop (frames since the first sample) """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TirrecReader(RecordingReader):
+    """ Reads a .tirrec file (see utils/recorder.py) through a memory map, or a compressed session
+        chunk (.tirrec.xz, .tirrec.zlib) decompressed into memory
+    """
+
+    def __init__(self, path, stride=INDEX_STRIDE):
+        self.path = path
+        self.stride = stride
+        self.header, self.records = read_chunk_file(path, chunk_codec(path))
+        self.fields = tuple(self.header['fields'])
+        self.t0 = float(self.records['time'][0]) if len(self.records) else 0.0
+
+        index = _load_index(path, stride)
+        if index is None:
+            index = self._build_index()
+            _save_index(path, stride, **index)
+        self.index_times = index['times']
+        self.index_frames = index['frames']
+        self.duration = float(self.records['time'][-1]) - self.t0 if len(self.records) else 0.0
+
+    def _build_index(self):
+        # Strided reads only touch one page per stride, but unwrapping frames has to see all of them
+        times = self.records['time'][::self.stride] - self.t0
+        frames = []
+        first = 0
+        previous = None
+        for start in range(0, len(self.records), _BLOCK_SIZE):
+            block = self.records['frame'][start:start + _BLOCK_SIZE]
+            if previous is not None:
+                first += (int(block[0]) - previous) & 0xFFFF
+            unwrapped = unwrap_frames(block, first)
+            frames.append(unwrapped[::self.stride])
+            first = int(unwrapped[-1])
+            previous = int(block[-1])
+        frames = np.concatenate(frames) if frames else np.empty(0, dtype=np.int64)
+        return {'times': times, 'frames': frames}
+
+    def _select(self, index_keys, start, stop, keys_of):
+        b0, b1 = _blocks(index_keys, start, stop)
+        records = self.records[b0 * self.stride:b1 * self.stride]
+        keys = keys_of(records, b0)
+        records = records[(keys >= start) & (keys < stop)]
+        out = np.array(records)
+        out['time'] -= self.t0
+        return out
+
+    def window(self, start, stop):
+        return self._select(self.index_times, start, stop,
+                            lambda records, b0: records['time'] - self.t0)
+
+    def frames(self, start, stop):
+        return self._select(self.index_frames, start, stop,
+                            lambda records, b0: unwrap_frames(records['frame'], self.index_frames[b0]))
+
+    def close(self):
+        self.records = np.empty(0, dtype=self.records.dtype)
+
+class CsvReader(RecordingReader):
+    """ Reads a Frame,<field labels> CSV file written by app/record.py through a memory map.
+
+        These files have no timestamps, so time is the unwrapped frame count divided by `rate`
+        (see ReplaySource). status is 0 for every sample.
+    """
+
+    def __init__(self, path, rate=120.0, stride=INDEX_STRIDE):
+        self.path = path
+        self.rate = rate
+        self.stride = stride
+        self.file = open(path, 'rb')
+        size = os.path.getsize(path)
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.size = size
+
+        header_end = self.mm.find(b'\n') + 1 if size else 0
+        labels = self.mm[:header_end].decode('utf-8').strip().split(',')
+        self.fields = tuple(_FIELDS_BY_LABEL[label] for label in labels[1:])
+        self.data_start = header_end
+
+        index = _load_index(path, stride)
+        if index is None:
+            index = self._build_index()
+            _save_index(path, stride, **index)
+        self.index_offsets = index['offsets']
+        self.index_frames = index['frames']
+        self.index_times = self.index_frames / rate
+        self.last_frame = int(index['last_frame'])
+        self.duration = self.last_frame / rate
+
+    def _parse(self, begin, end):
+        """ Rows between two byte offsets as a (N, 1 + len(fields)) float array """
+        if end <= begin:
+            return np.empty((0, 1 + len(self.fields)))
+        return np.loadtxt(io.BytesIO(self.mm[begin:end]), delimiter=',', ndmin=2)
+
+    def _build_index(self):
+        # A block of whole lines at a time, and only the Frame column, so memory stays bounded however
+        # long the recording is
+        offsets, frames = [], []
+        row = 0
+        first = 0
+        previous = None
+        pos = self.data_start
+        while pos < self.size:
+            end = self.mm.rfind(b'\n', pos, pos + _CSV_BLOCK_BYTES) + 1
+            if end <= pos or pos + _CSV_BLOCK_BYTES >= self.size:
+                end = self.size
+            chunk = self.mm[pos:end]
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            # Every line starts after a newline; drop the one after the last newline of the block
+            starts = np.concatenate(([0], np.flatnonzero(data == ord('\n')) + 1))
+            starts = starts[starts < len(chunk)] + pos
+            block = np.loadtxt(io.BytesIO(chunk), delimiter=',', usecols=0, ndmin=1).astype(np.int64)
+            if len(block) != len(starts):
+                raise ValueError("Unexpected blank lines in {}".format(self.path))
+            if previous is not None:
+                first += (int(block[0]) - previous) & 0xFFFF
+            unwrapped = unwrap_frames(block, first)
+            skip = -row % self.stride  # keep every stride-th row of the whole file
+            offsets.append(starts[skip::self.stride])
+            frames.append(unwrapped[skip::self.stride])
+            row += len(block)
+            first = int(unwrapped[-1])
+            previous = int(block[-1])
+            pos = end
+        return {
+            'offsets': np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64),
+            'frames': np.concatenate(frames) if frames else np.empty(0, dtype=np.int64),
+            'last_frame': first,
+        }
+
+    def _offset(self, block):
+        return int(self.index_offsets[block]) if block < len(self.index_offsets) else self.size
+
+    def frames(self, start, stop):
+        b0, b1 = _blocks(self.index_frames, start, stop)
+        rows = self._parse(self._offset(b0), self._offset(b1))
+        frames = unwrap_frames(rows[:, 0].astype(np.int64), self.index_frames[b0]) if len(rows) else np.empty(0, np.int64)
+        keep = (frames >= start) & (frames < stop)
+        rows = rows[keep]
+
+        out = np.zeros(len(rows), dtype=sample_dtype(self.fields))
+        out['time'] = frames[keep] / self.rate
+        out['frame'] = rows[:, 0].astype(np.int64).astype(np.int16)
+        for i, name in enumerate(self.fields):
+            out[name] = rows[:, i + 1]
+        return out
+
+    def window(self, start, stop):
+        # time and frame are the same thing here; clamped first, so e.g. stop=np.inf reads to the end
+        start, stop = (min(max(value * self.rate, 0), self.last_frame + 1) for value in (start, stop))
+        return self.frames(int(np.ceil(start)), int(np.ceil(stop)))
+
+    def close(self):
+        if self.size:
+            self.mm.close()
+        self.file.close()
+
+class SessionReader(RecordingReader):
+    """ Reads a session directory written by SessionRecorder, chunk by chunk.
+
+        The manifest has the time and frame span of every chunk, so a window only opens the chunks it
+        overlaps. Uncompressed chunks are memory mapped; compressed ones are decompressed whole, and the
+        last `cache_size` of them are kept around for the next window.
+    """
+
+    def __init__(self, session_dir, cache_size=2):
+        self.session_dir = session_dir
+        self.manifest = read_manifest(session_dir)
+        self.fields = tuple(self.manifest['fields'])
+        self.chunks = [chunk for chunk in self.manifest['chunks'] if chunk['count']]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        self.t0 = self.chunks[0]['t_start'] if self.chunks else 0.0
+        self.chunk_times = np.array([chunk['t_start'] - self.t0 for chunk in self.chunks])
+        # Unwrapped frame number of the first sample of every chunk
+        first_frames = []
+        frame = 0
+        for i, chunk in enumerate(self.chunks):
+            if i:
+                previous = self.chunks[i - 1]
+                frame += self._frame_span(i - 1) + ((chunk['frame_first'] - previous['frame_last']) & 0xFFFF)
+            first_frames.append(frame)
+        self.chunk_frames = np.array(first_frames, dtype=np.int64)
+        self.duration = self.chunks[-1]['t_end'] - self.t0 if self.chunks else 0.0
+
+    def _frame_span(self, i):
+        chunk = self.chunks[i]
+        if 'frame_span' not in chunk:
+            # manifests from before frame_span was added
+            frames = self._chunk(i)['frame']
+            chunk['frame_span'] = int(unwrap_frames(frames)[-1])
+        return chunk['frame_span']
+
+    def _chunk(self, i):
+        if i in self._cache:
+            self._cache.move_to_end(i)
+            return self._cache[i]
+        records = read_chunk(self.session_dir, self.chunks[i])
+        self._cache[i] = records
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return records
+
+    def _select(self, index_keys, start, stop, keys_of):
+        b0, b1 = _blocks(index_keys, start, stop)
+        parts = []
+        for i in range(b0, b1):
+            records = self._chunk(i)
+            keys = keys_of(records, i)
+            parts.append(records[(keys >= start) & (keys < stop)])
+        out = np.concatenate(parts) if parts else np.empty(0, dtype=sample_dtype(self.fields))
+        out['time'] -= self.t0
+        return out
+
+    def window(self, start, stop):
+        return self._select(self.chunk_times, start, stop,
+                            lambda records, i: records['time'] - self.t0)
+
+    def frames(self, start, stop):
+        return self._select(self.chunk_frames, start, stop,
+                            lambda records, i: unwrap_frames(records['frame'], self.chunk_frames[i]))
+
+    def close(self):
+        self._cache.clear()
+
+def is_chunk_file(path):
+    try:
+        chunk_codec(path)
+        return True
+    except ValueError:
+        return False
+
+def open_recording(path, rate=None, **options) -> RecordingReader:
+    """ The reader for a .tirrec file or chunk, a session directory or a CSV file.
+        rate is the frame rate CSV files are read at (they have no timestamps), 120 Hz if None
+    """
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, MANIFEST)):
+            raise ValueError("No {} in {}".format(MANIFEST, path))
+        return SessionReader(path, **options)
+    if is_chunk_file(path):
+        return TirrecReader(path, **options)
+    if rate is not None:
+        options['rate'] = rate
+    return CsvReader(path, **options)
@@ -0,0 +1,231 @@
+# utils/recorder.py
+
+""" Binary recording of TrackIR samples.
+
+    BinaryRecorder is fed from the acquisition thread, one sample at a time, but never touches the disk
+    there: samples are copied raw into preallocated batches, and a writer thread decodes and writes
+    whole batches and fsyncs the file every durability_interval seconds.
+
+    A .tirrec file is an 8 byte magic, a 4 byte little endian header length and a JSON header
+    (fields, dtype, created), followed by fixed width sample_dtype(fields) records:
+    time (monotonic seconds), frame, status and the recorded fields (by default the 6 DOF).
+
+    Convert a recording (a Record session directory, one of its chunks or a .tirrec file) to the
+    Frame,Roll,Pitch,Yaw,X,Y,Z CSV layout of app/record.py with
+
+      python -m utils.recorder data/rawdata/session_20240101_120000
+"""
+import argparse
+import csv
+import ctypes
+import datetime
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from utils.trackir import RAW_SAMPLE_DTYPE, POSE_FIELDS, sample_dtype, decode_fields, field_labels
+
+MAGIC = b'TIRREC1\0'
+EXTENSION = '.tirrec'
+
+# Where the tir_data bytes go in a RAW_SAMPLE_DTYPE record
+_DATA_OFFSET = RAW_SAMPLE_DTYPE.fields['data'][1]
+_DATA_SIZE = RAW_SAMPLE_DTYPE['data'].itemsize
+
+def decode_records(raw: np.ndarray, fields=POSE_FIELDS) -> np.ndarray:
+    """ Convert RAW_SAMPLE_DTYPE records into sample_dtype(fields) records """
+    records = np.empty(len(raw), dtype=sample_dtype(fields))
+    records['time'] = raw['time']
+    records['frame'] = raw['data']['frame']
+    records['status'] = raw['data']['status']
+    values = decode_fields(raw['data'], fields)
+    for i, name in enumerate(fields):
+        records[name] = values[:, i]
+    return records
+
+def write_header(f, fields=POSE_FIELDS, **extra):
+    """ Write the .tirrec header. Returns the offset of the first record """
+    header = dict(fields=list(fields), dtype=sample_dtype(fields).descr,
+                  created=datetime.datetime.now().isoformat(), **extra)
+    data = json.dumps(header).encode('utf-8')
+    f.write(MAGIC)
+    f.write(struct.pack('<I', len(data)))
+    f.write(data)
+    return len(MAGIC) + 4 + len(data)
+
+def read_header(f):
+    """ Read the .tirrec header. Returns (header dict, offset of the first record) """
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a {} file".format(EXTENSION))
+    size, = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(size).decode('utf-8'))
+    return header, len(MAGIC) + 4 + size
+
+def read_recording(path):
+    """ Return (header, records) of a .tirrec file. records is a read-only memory map """
+    with open(path, 'rb') as f:
+        header, offset = read_header(f)
+    dtype = sample_dtype(header['fields'])
+    if os.path.getsize(path) - offset < dtype.itemsize:
+        return header, np.empty(0, dtype=dtype)
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    return header, np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+def to_csv(path, csv_path=None, window=600.0):
+    """ Convert a recording (a session directory, a chunk or a .tirrec file, see utils.reader) to the
+        Frame,<field labels> CSV layout written by app/record.py, `window` seconds at a time
+    """
+    from utils.reader import open_recording  # utils.reader imports this module
+
+    if csv_path is None:
+        base = path.rstrip('/\\')
+        for suffix in ('.xz', '.zlib', EXTENSION):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        csv_path = base + '.csv'
+    with open_recording(path) as recording, open(csv_path, 'w', newline='') as f:
+        fields = recording.fields
+        writer = csv.writer(f)
+        writer.writerow(['Frame'] + field_labels(fields))
+        start = 0.0
+        while start <= recording.duration:
+            records = recording.window(start, start + window)
+            columns = [records['frame'].tolist()] + [records[name].astype(float).tolist() for name in fields]
+            writer.writerows(zip(*columns))
+            start += window
+    return csv_path
+
+class BinaryRecorder:
+    """ Records samples to a .tirrec file from a dedicated writer thread.
+
+        write() is called on the acquisition thread and only copies the raw sample into the current batch.
+        Full batches (and partial ones older than durability_interval) go to the writer thread. If samples
+        stop coming, the writer thread takes the partial batch itself once it is that old, so what was
+        recorded is on disk within about durability_interval either way.
+        At most max_pending_batches are buffered; if the disk can't keep up, further samples are
+        dropped and counted in `dropped` instead of stalling acquisition.
+    """
+
+    def __init__(self, path, fields=POSE_FIELDS, batch_size=512, max_pending_batches=32, durability_interval=1.0):
+        self.path = path
+        self.fields = tuple(fields)
+        self.batch_size = batch_size
+        self.durability_interval = durability_interval
+        self.file = open(path, 'wb')
+        write_header(self.file, self.fields)
+
+        # Preallocated batches cycle between the free list and the writer queue
+        self._free = queue.Queue()
+        for _ in range(max_pending_batches + 1):
+            self._free.put(np.zeros(batch_size, dtype=RAW_SAMPLE_DTYPE))
+        self._full = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch = None
+        self._count = 0
+        self._batch_started = 0.0
+        self._batch_opened = 0.0  # time.perf_counter() when the batch got its first sample
+        self.closed = False
+
+        # 통계
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def write(self, timestamp, data):
+        """ Add one TrackIR_6DOF_Data sample taken at timestamp. Called from the acquisition thread """
+        with self._lock:
+            if self.closed:
+                return
+            if self._batch is None:
+                try:
+                    self._batch = self._free.get_nowait()
+                except queue.Empty:
+                    self.dropped += 1
+                    return
+                self._batch_address = self._batch.ctypes.data
+                self._count = 0
+                self._batch_started = timestamp
+                self._batch_opened = time.perf_counter()
+            offset = self._count * RAW_SAMPLE_DTYPE.itemsize
+            struct.pack_into('<d', self._batch, offset, timestamp)
+            ctypes.memmove(self._batch_address + offset + _DATA_OFFSET, ctypes.addressof(data), _DATA_SIZE)
+            self._count += 1
+            if self._count == self.batch_size or timestamp - self._batch_started >= self.durability_interval:
+                self._hand_off()
+
+    def _hand_off(self):
+        self._full.put((self._batch, self._count))
+        self._batch = None
+        self._count = 0
+
+    def _write_loop(self):
+        last_sync = time.perf_counter()
+        while True:
+            try:
+                item = self._full.get(timeout=self.durability_interval / 4)
+            except queue.Empty:
+                item = self._take_stale()
+            if item is None:
+                break
+            if item:
+                batch, count = item
+                try:
+                    self.file.write(decode_records(batch[:count], self.fields).tobytes())
+                    self.written += count
+                except OSError as e:
+                    self.error = e
+                self._free.put(batch)
+            if time.perf_counter() - last_sync >= self.durability_interval:
+                self._sync()
+                last_sync = time.perf_counter()
+        self._sync()
+
+    def _take_stale(self):
+        # The partial batch, if acquisition paused before it got old enough for write() to hand it off
+        with self._lock:
+            if self._batch is None or not self._count:
+                return ()
+            if time.perf_counter() - self._batch_opened < self.durability_interval:
+                return ()
+            item = (self._batch, self._count)
+            self._batch = None
+            self._count = 0
+            return item
+
+    def _sync(self):
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError as e:
+            self.error = e
+
+    def close(self):
+        """ Write everything still buffered and close the file """
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._batch is not None and self._count:
+                self._hand_off()
+            self._full.put(None)
+        self._writer.join()
+        self.file.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a recording to CSV")
+    parser.add_argument('path', help="recording to convert: a Record session directory, one of its chunks or a {} file"
+                        .format(EXTENSION))
+    parser.add_argument('csv_path', nargs='?', help="output file (default: same name with .csv)")
+    args = parser.parse_args()
+    print(to_csv(args.path, args.csv_path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# utils/running_stats.py
+
+import numpy as np
+
+class RunningStats:
+    """ Count, mean, variance, min and max of a stream of samples in constant memory.
+
+        Each channel (column) is tracked separately. update() takes a whole batch and folds its
+        mean and sum of squared deviations into the running ones (Welford's method, in the batched
+        form of Chan et al.), which stays accurate over millions of samples.
+
+          stats = RunningStats(2)
+          stats.update(samples)   # (N, 2)
+          stats.mean, stats.std, stats.min, stats.max
+    """
+
+    def __init__(self, channels=1):
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = np.zeros(self.channels)
+        self._m2 = np.zeros(self.channels)
+        self.min = np.full(self.channels, np.inf)
+        self.max = np.full(self.channels, -np.inf)
+
+    @property
+    def variance(self):
+        """ Sample variance (0 until there are two samples) """
+        if self.count < 2:
+            return np.zeros(self.channels)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def update(self, values):
+        """ Add a batch of samples, (N, channels) or (N,) with one channel """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.channels)
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self._m2 = self._m2 + batch_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+        np.minimum(self.min, values.min(axis=0), out=self.min)
+        np.maximum(self.max, values.max(axis=0), out=self.max)
@@ -0,0 +1,104 @@
+# utils/sample_ring.py
+
+import numpy as np
+
+OVERWRITE_OLDEST = 'overwrite_oldest'
+DROP_NEWEST = 'drop_newest'
+
+class SampleRing:
+    """ A fixed capacity single-producer/single-consumer ring buffer of NumPy structured records.
+
+        The producer thread writes records in place and the consumer thread takes everything pending
+        at once with drain(), which returns one contiguous array. There are no locks: only the producer
+        moves `head` and only the consumer moves `tail` (both count records since the start).
+
+          ring = SampleRing(1024, dtype)
+          # producer
+          index = ring.claim()
+          if index is not None:
+             ring.buffer[index] = ...   # or let the DLL write into a ctypes view of ring.buffer
+             ring.commit()
+          # consumer
+          records = ring.drain()
+
+        When the consumer falls behind by more than `capacity` records, the policy decides what is lost:
+          OVERWRITE_OLDEST - the producer keeps writing and drain() skips what was overwritten (counted in overwritten)
+          DROP_NEWEST      - claim() returns None until there is room again (counted in dropped via drop())
+        high_water is the largest number of pending records seen.
+    """
+
+    def __init__(self, capacity, dtype, policy=OVERWRITE_OLDEST):
+        if policy not in (OVERWRITE_OLDEST, DROP_NEWEST):
+            raise ValueError("Unknown policy {}".format(policy))
+        self.capacity = capacity
+        self.policy = policy
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.head = 0
+        self.tail = 0
+
+        # 통계
+        self.high_water = 0
+        self.dropped = 0      # written by the producer
+        self.overwritten = 0  # written by the consumer
+
+    @property
+    def overruns(self):
+        """ Records lost to the policy, either way """
+        return self.dropped + self.overwritten
+
+    def __len__(self):
+        return min(self.head - self.tail, self.capacity)
+
+    def claim(self):
+        """ Producer: index of the slot to write the next record into, or None if the ring is full
+            with DROP_NEWEST. Call drop() if a record is discarded because of that
+        """
+        if self.policy == DROP_NEWEST and self.head - self.tail >= self.capacity:
+            return None
+        return self.head % self.capacity
+
+    def drop(self):
+        """ Producer: count a record that was discarded because claim() returned None """
+        self.dropped += 1
+
+    def commit(self):
+        """ Producer: publish the record written into the claimed slot """
+        self.head += 1
+        pending = min(self.head - self.tail, self.capacity)
+        if pending > self.high_water:
+            self.high_water = pending
+
+    def push(self, record) -> bool:
+        """ Producer: claim, write and commit one record (a tuple matching the dtype). Returns False if dropped """
+        index = self.claim()
+        if index is None:
+            self.drop()
+            return False
+        self.buffer[index] = record
+        self.commit()
+        return True
+
+    def drain(self) -> np.ndarray:
+        """ Consumer: return a copy of all pending records, oldest first """
+        head = self.head
+        tail = self.tail
+        if head - tail > self.capacity:
+            self.overwritten += head - tail - self.capacity
+            tail = head - self.capacity
+
+        start = tail % self.capacity
+        end = start + head - tail
+        if end <= self.capacity:
+            records = self.buffer[start:end].copy()
+        else:
+            records = np.concatenate((self.buffer[start:], self.buffer[:end - self.capacity]))
+
+        if self.policy == OVERWRITE_OLDEST:
+            # The producer may have lapped us while we copied. Everything older than the slot it can be
+            # writing right now (head - capacity) is suspect, so drop it
+            torn = (self.head - self.capacity + 1) - tail
+            if torn > 0:
+                self.overwritten += torn
+                records = records[torn:]
+        self.tail = head
+        return records
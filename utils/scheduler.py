@@ -0,0 +1,79 @@
+# utils/scheduler.py
+
+import time
+from collections import deque
+
+class DeadlineScheduler:
+    """ Paces a loop on absolute deadlines of the monotonic time.perf_counter_ns() clock.
+
+        Unlike time.sleep(period) after every iteration, the time spent in the loop body does not add up:
+        tick n is due at start + n*period. wait() sleeps until spin_threshold before the deadline and
+        then spins (yielding the GIL) for the last bit, which gives sub-millisecond accuracy.
+        If the loop falls more than a whole period behind, the missed ticks are skipped and counted
+        instead of being run back to back.
+
+          scheduler = DeadlineScheduler(1/120)
+          while running:
+             scheduler.wait()
+             poll()
+    """
+
+    def __init__(self, period: float, spin_threshold: float = 0.001, history: int = 1024):
+        self.period_ns = int(period * 1e9)
+        self.spin_ns = int(spin_threshold * 1e9)
+        self.next_deadline = None
+
+        # Lateness statistics, in nanoseconds
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.total_lateness = 0
+        self.max_lateness = 0
+        self.recent_lateness = deque(maxlen=history)
+
+    def set_period(self, period: float):
+        """ Change the period. The next deadline is kept, later ones use the new period """
+        self.period_ns = int(period * 1e9)
+
+    def reset(self):
+        """ Start a new deadline grid from now, e.g. after the loop was paused """
+        self.next_deadline = None
+
+    def wait(self) -> int:
+        """ Block until the next deadline and return the perf_counter_ns() time we woke up at """
+        now = time.perf_counter_ns()
+        if self.next_deadline is None:
+            self.next_deadline = now + self.period_ns
+        deadline = self.next_deadline
+
+        remaining = deadline - now
+        if remaining > self.spin_ns:
+            time.sleep((remaining - self.spin_ns) / 1e9)
+        now = time.perf_counter_ns()
+        while now < deadline:
+            time.sleep(0)  # 다른 스레드에 GIL 양보
+            now = time.perf_counter_ns()
+
+        lateness = now - deadline
+        self.ticks += 1
+        self.total_lateness += lateness
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        self.recent_lateness.append(lateness)
+
+        self.next_deadline = deadline + self.period_ns
+        if now >= self.next_deadline:
+            skipped = (now - self.next_deadline) // self.period_ns + 1
+            self.missed_ticks += skipped
+            self.next_deadline += skipped * self.period_ns
+        return now
+
+    def stats(self):
+        """ Lateness statistics in microseconds """
+        recent = sorted(self.recent_lateness)
+        return {
+            'ticks': self.ticks,
+            'missed_ticks': self.missed_ticks,
+            'mean_lateness_us': self.total_lateness / self.ticks / 1000 if self.ticks else 0.0,
+            'max_lateness_us': self.max_lateness / 1000,
+            'p99_lateness_us': recent[int(len(recent) * 0.99)] / 1000 if recent else 0.0,
+        }
@@ -0,0 +1,232 @@
+# utils/session.py
+
+""" Long recordings as a directory of fixed duration, compressed chunks.
+
+    A session directory looks like
+
+      data/rawdata/session_20240101_120000/
+         manifest.json
+         chunk_0000.tirrec.xz
+         chunk_0001.tirrec.xz
+         chunk_0002.tirrec        <- still being recorded
+         chunk_0003.tirrec        <- opened ahead of time, still empty
+
+    SessionRecorder writes each chunk with a BinaryRecorder (see utils/recorder.py) and starts a new one
+    every chunk_seconds. Finished chunks are compressed with zlib or lzma on a background thread, and
+    manifest.json lists every finished chunk with its file, time range, frame span and sample count,
+    so a tool can open just the chunk it needs with read_chunk() (or use utils/reader.py, which also
+    opens a single chunk file, compressed or not).
+"""
+import datetime
+import io
+import json
+import lzma
+import os
+import queue
+import threading
+import zlib
+
+import numpy as np
+
+from utils.trackir import POSE_FIELDS, sample_dtype
+from utils.recorder import BinaryRecorder, EXTENSION, read_header, read_recording
+
+MANIFEST = 'manifest.json'
+# codec name -> file suffix
+CODECS = {
+    None: '',
+    'zlib': '.zlib',
+    'lzma': '.xz',
+}
+_BLOCK_SIZE = 1 << 20
+
+def _compressor(codec):
+    if codec == 'zlib':
+        return zlib.compressobj(6)
+    return lzma.LZMACompressor()
+
+def _decompress(codec, data):
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'lzma':
+        return lzma.decompress(data)
+    return data
+
+def read_manifest(session_dir):
+    with open(os.path.join(session_dir, MANIFEST)) as f:
+        return json.load(f)
+
+def chunk_codec(path):
+    """ The codec of a chunk file from its name: None for a plain .tirrec, 'zlib' or 'lzma'.
+        Raises ValueError if it is not a chunk file
+    """
+    for codec, suffix in CODECS.items():
+        if path.endswith(EXTENSION + suffix):
+            return codec
+    raise ValueError("Not a {} chunk: {}".format(EXTENSION, path))
+
+def read_chunk_file(path, codec=None):
+    """ Return (header, records) of a chunk file, compressed with codec or not. Uncompressed files are
+        memory mapped; compressed ones are decompressed whole
+    """
+    if codec is None:
+        return read_recording(path)
+    with open(path, 'rb') as f:
+        data = _decompress(codec, f.read())
+    header, offset = read_header(io.BytesIO(data))
+    return header, np.frombuffer(data, dtype=sample_dtype(header['fields']), offset=offset)
+
+def read_chunk(session_dir, chunk):
+    """ Return the records of one manifest chunk entry as a sample_dtype array """
+    return read_chunk_file(os.path.join(session_dir, chunk['file']), chunk['codec'])[1]
+
+class SessionRecorder:
+    """ Records into a session directory, rotating to a new chunk every chunk_seconds.
+
+        Has the same write()/close() interface as BinaryRecorder. Nothing is opened, closed or compressed
+        on the acquisition thread: a background thread keeps the next chunk's BinaryRecorder open ahead of
+        time, so rotation only swaps it in, and then closes and compresses the finished chunk and updates
+        the manifest. If that thread falls behind so far that the next chunk isn't open yet, the current
+        chunk just runs longer.
+
+        close(wait=False) returns at once and leaves the rest of the work to the background thread,
+        e.g. for a UI; poll finished() to know when the session is complete.
+    """
+
+    def __init__(self, session_dir, fields=POSE_FIELDS, chunk_seconds=600.0, codec='lzma', **recorder_options):
+        if codec not in CODECS:
+            raise ValueError("Unknown codec {}".format(codec))
+        os.makedirs(session_dir, exist_ok=True)
+        self.session_dir = session_dir
+        self.fields = tuple(fields)
+        self.chunk_seconds = chunk_seconds
+        self.codec = codec
+        self.recorder_options = recorder_options
+        self.manifest = {
+            'version': 1,
+            'fields': list(self.fields),
+            'codec': codec,
+            'chunk_seconds': chunk_seconds,
+            'created': datetime.datetime.now().isoformat(),
+            'chunks': [],
+        }
+        self._write_manifest()
+
+        self.chunk_index = 0
+        self.chunk_start = None
+        self.closed = False
+        self._lock = threading.Lock()
+        self._dropped_before = 0
+        self._next_chunk = 0
+        self.recorder = self._open_chunk()
+        self._spare = queue.Queue()     # the next chunk, opened by the compressor thread
+        self._finished = queue.Queue()
+        self._compressor = threading.Thread(target=self._compress_loop, daemon=True)
+        self._compressor.start()
+
+    @property
+    def dropped(self):
+        return self._dropped_before + (self.recorder.dropped if self.recorder is not None else 0)
+
+    def write(self, timestamp, data):
+        """ Add one TrackIR_6DOF_Data sample taken at timestamp. Called from the acquisition thread """
+        with self._lock:
+            if self.closed:
+                return
+            if self.chunk_start is None:
+                self.chunk_start = timestamp
+            elif timestamp - self.chunk_start >= self.chunk_seconds:
+                self._rotate(timestamp)
+            self.recorder.write(timestamp, data)
+
+    def _rotate(self, timestamp):
+        try:
+            recorder = self._spare.get_nowait()
+        except queue.Empty:
+            return  # not open yet, try again at the next sample
+        self._finished.put(self.recorder)
+        self.recorder = recorder
+        self.chunk_index += 1
+        self.chunk_start = timestamp
+
+    def _open_chunk(self):
+        path = os.path.join(self.session_dir, 'chunk_{:04d}{}'.format(self._next_chunk, EXTENSION))
+        self._next_chunk += 1
+        return BinaryRecorder(path, self.fields, **self.recorder_options)
+
+    def _compress_loop(self):
+        self._spare.put(self._open_chunk())
+        while True:
+            recorder = self._finished.get()
+            if recorder is None:
+                break
+            # Open the chunk after next first, so it's ready before the next rotation
+            if not self.closed:
+                self._spare.put(self._open_chunk())
+            recorder.close()
+            self._dropped_before += recorder.dropped
+            self._finish_chunk(recorder.path)
+
+        # Chunks that were opened but never written to
+        while not self._spare.empty():
+            spare = self._spare.get()
+            spare.close()
+            os.remove(spare.path)
+
+    def _finish_chunk(self, path):
+        header, records = read_recording(path)
+        chunk = {
+            'file': os.path.basename(path) + CODECS[self.codec],
+            'codec': self.codec,
+            'count': len(records),
+            't_start': float(records['time'][0]) if len(records) else None,
+            't_end': float(records['time'][-1]) if len(records) else None,
+            'frame_first': int(records['frame'][0]) if len(records) else None,
+            'frame_last': int(records['frame'][-1]) if len(records) else None,
+            # frame_last - frame_first without the 16 bit wraparound
+            'frame_span': int(np.sum(np.diff(records['frame'].astype(np.int64)) & 0xFFFF)),
+        }
+        del records
+
+        if self.codec is not None:
+            compressor = _compressor(self.codec)
+            with open(path, 'rb') as src, open(path + CODECS[self.codec], 'wb') as dst:
+                while True:
+                    block = src.read(_BLOCK_SIZE)
+                    if not block:
+                        break
+                    dst.write(compressor.compress(block))
+                dst.write(compressor.flush())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(path)
+
+        self.manifest['chunks'].append(chunk)
+        self._write_manifest()
+
+    def _write_manifest(self):
+        # 중간에 꺼져도 manifest가 깨지지 않도록 임시 파일에 쓰고 교체
+        path = os.path.join(self.session_dir, MANIFEST)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    def close(self, wait=True):
+        """ Finish the current chunk. Waits until every chunk is compressed and in the manifest,
+            unless wait is False
+        """
+        with self._lock:
+            if not self.closed:
+                self.closed = True
+                if self.chunk_start is None:
+                    self._spare.put(self.recorder)  # nothing was written to it
+                else:
+                    self._finished.put(self.recorder)
+                self.recorder = None
+                self._finished.put(None)
+        if wait:
+            self._compressor.join()
+
+    def finished(self):
+        """ True once close() has been called and everything is compressed and in the manifest """
+        return self.closed and not self._compressor.is_alive()
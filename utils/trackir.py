@@ -1,6 +1,7 @@
 """ Library to read 6 DOF (Degrees of Information) from a TrackIR camera.
 
-    Note that this only works on Windows, since it requires the TrackIR.dll.
+    Note that TrackIRDLL only works on Windows, since it requires the TrackIR.dll.
+    The data structures and decoders can be imported on any platform (see utils/pose_source.py).
     The TrackIR software must be running, and use the 1:1 mapping if you want real values
 
     See log_to_csv.py for example usage
@@ -9,10 +10,15 @@ from __future__ import annotations
 import ctypes
 from ctypes import wintypes
 from typing import Union
-import winreg
+try:
+    import winreg
+except ImportError:  # Not on Windows.  TrackIRDLL can't be used, but the data structures still can
+    winreg = None
 import os
 import sys
 
+import numpy as np
+
 
 verbose = True
 
@@ -20,6 +26,17 @@ def logprint(*args, **kwargs):
     """ Function to print debug info"""
     if verbose:
         print(*args, file=sys.stderr, **kwargs)
+
+# Return values of the DLL functions (see npResultToString)
+NP_OK = 0
+NP_ERR_DEVICE_NOT_PRESENT = 1
+NP_ERR_UNSUPPORTED_OS = 2
+NP_ERR_INVALID_ARG = 3
+NP_ERR_DLL_NOT_FOUND = 4
+NP_ERR_NO_DATA = 5
+NP_ERR_INTERNAL_DATA = 6
+NP_ERR_ALREADY_REGISTERED = 7
+
 def npResultToString(retValue: int):
     if retValue >= 0 and retValue <= 7:
         return [
@@ -135,13 +152,119 @@ class TrackIR_6DOF_Data(ctypes.Structure):
         return "status: {0}, frame: {1}, cksum: {2}, roll: {3}, pitch: {4}, yaw: {5}, x: {6}, y: {7}, z: {8}".format(
             self.status, self.frame, self.cksum, round(self.roll), round(self.pitch), round(self.yaw), round(self.x), round(self.y), round(self.z))
 
+    def set_pose(self, roll: float, pitch: float, yaw: float, x: float, y: float, z: float):
+        """ The inverse of the helper properties: store degrees/mm as the raw values the DLL would report """
+        for (name, scale), value in zip(_POSE_SCALES, (roll, pitch, yaw, x, y, z)):
+            setattr(self, name, value / scale)
+
+
+# NumPy equivalent of the packed 'struct tir_data' above, so blocks of samples can be decoded in one go.
+# The field names and offsets match TrackIR_6DOF_Data._fields_ byte-for-byte.
+TIR_DATA_DTYPE = np.dtype({
+    'names': [name for name, _ in TrackIR_6DOF_Data._fields_],
+    'formats': ['<i2', '<i2', '<u4'] + ['<f4'] * 15,
+    'offsets': [getattr(TrackIR_6DOF_Data, name).offset for name, _ in TrackIR_6DOF_Data._fields_],
+    'itemsize': ctypes.sizeof(TrackIR_6DOF_Data),
+})
+
+# Column order of the arrays returned by decode_6dof()
+POSE_FIELDS = ('roll', 'pitch', 'yaw', 'x', 'y', 'z')
+ROLL, PITCH, YAW, X, Y, Z = range(6)
+
+# NP_RequestData field flags (see TrackIRDLL.NP_RequestData)
+NPFIELD_ROLL = 1
+NPFIELD_PITCH = 2
+NPFIELD_YAW = 4
+NPFIELD_X = 16
+NPFIELD_Y = 32
+NPFIELD_Z = 64
+NPFIELD_RAWX = 128
+NPFIELD_RAWY = 256
+NPFIELD_RAWZ = 512
+NPFIELD_DELTAX = 1024
+NPFIELD_DELTAY = 2048
+NPFIELD_DELTAZ = 4096
+NPFIELD_SMOOTHX = 8192
+NPFIELD_SMOOTHY = 16384
+NPFIELD_SMOOTHZ = 32768
+
+NPFIELDS_6DOF = 119  # roll, pitch, yaw, x, y, z - the default
+NPFIELDS_RAW = NPFIELD_RAWX | NPFIELD_RAWY | NPFIELD_RAWZ
+NPFIELDS_DELTA = NPFIELD_DELTAX | NPFIELD_DELTAY | NPFIELD_DELTAZ
+NPFIELDS_SMOOTH = NPFIELD_SMOOTHX | NPFIELD_SMOOTHY | NPFIELD_SMOOTHZ
+NPFIELDS_ALL = 65535
+
+# Every decodable field as (name, NP_RequestData flag, raw struct field, scale, CSV column label).
+# The imager values are passed through in their raw 0..25600 units
+FIELDS = (
+    ('roll', NPFIELD_ROLL, '_roll', -90/16383, 'Roll'),
+    ('pitch', NPFIELD_PITCH, '_pitch', -180/16383, 'Pitch'),
+    ('yaw', NPFIELD_YAW, '_yaw', -180/16383, 'Yaw'),
+    ('x', NPFIELD_X, '_x', -1/64, 'X'),
+    ('y', NPFIELD_Y, '_y', 1/64, 'Y'),
+    ('z', NPFIELD_Z, '_z', 1/64, 'Z'),
+    ('rawx', NPFIELD_RAWX, '_rawx', 1.0, 'RawX'),
+    ('rawy', NPFIELD_RAWY, '_rawy', 1.0, 'RawY'),
+    ('rawz', NPFIELD_RAWZ, '_rawz', 1.0, 'RawZ'),
+    ('deltax', NPFIELD_DELTAX, '_deltax', 1.0, 'DeltaX'),
+    ('deltay', NPFIELD_DELTAY, '_deltay', 1.0, 'DeltaY'),
+    ('deltaz', NPFIELD_DELTAZ, '_deltaz', 1.0, 'DeltaZ'),
+    ('smoothx', NPFIELD_SMOOTHX, '_smoothx', 1.0, 'SmoothX'),
+    ('smoothy', NPFIELD_SMOOTHY, '_smoothy', 1.0, 'SmoothY'),
+    ('smoothz', NPFIELD_SMOOTHZ, '_smoothz', 1.0, 'SmoothZ'),
+)
+_FIELDS_BY_NAME = {field[0]: field for field in FIELDS}
+# Same conversions as the TrackIR_6DOF_Data properties, as (raw field, scale) pairs
+_POSE_SCALES = tuple((field[2], field[3]) for field in FIELDS[:6])
+
+def fields_for_mask(mask: int) -> tuple:
+    """ Names of the fields NP_RequestData(mask) fills, in FIELDS order """
+    return tuple(field[0] for field in FIELDS if mask & field[1])
+
+def field_labels(fields) -> list:
+    """ CSV column labels of the given field names """
+    return [_FIELDS_BY_NAME[name][4] for name in fields]
+
+def field_scales(fields) -> list:
+    """ (raw struct field, scale) pairs for decoding the given field names one sample at a time """
+    return [(_FIELDS_BY_NAME[name][2], _FIELDS_BY_NAME[name][3]) for name in fields]
+
+def decode_fields(raw: np.ndarray, fields) -> np.ndarray:
+    """ Like decode_6dof, but only decodes the given field names (e.g. fields_for_mask(mask)).
+        Returns an (N, len(fields)) float64 array in the order of fields.
+    """
+    raw = np.asarray(raw)
+    scales = field_scales(fields)
+    out = np.empty((raw.shape[0], len(scales)))
+    for i, (name, scale) in enumerate(scales):
+        np.multiply(raw[name], scale, out=out[:, i])
+    return out
+
+def decode_6dof(raw: np.ndarray) -> np.ndarray:
+    """ Convert an array of TIR_DATA_DTYPE records into an (N, 6) float64 array of
+        roll, pitch, yaw (degrees) and x, y, z (mm), in POSE_FIELDS order.
+    """
+    return decode_fields(raw, POSE_FIELDS)
+
+def sample_dtype(fields=POSE_FIELDS) -> np.dtype:
+    """ dtype of one decoded sample: monotonic timestamp in seconds (time.perf_counter()),
+        frame counter, status and the given fields
+    """
+    return np.dtype([('time', '<f8'), ('frame', '<i2'), ('status', '<i2')] + [(name, '<f4') for name in fields])
+
+# One decoded 6 DOF sample. This is what gets passed between processes (see utils/pose_bus.py)
+SAMPLE_DTYPE = sample_dtype()
+
+# A raw tir_data record with the time.perf_counter() time it was polled at (see app/collector.py)
+RAW_SAMPLE_DTYPE = np.dtype([('time', '<f8'), ('data', TIR_DATA_DTYPE)])
+
 
 class TrackIRDLL():
     """ A class that loads the trackIR dll (NPClient64.dll) and provides functions to call them.
         The functions starting with the name 'NP_' in this class just call that function in the DLL.
     """
 
-    def __init__(self, hWnd: Union[wintypes.HWND,int,str], trackir_profile_id: int =3750):  # Note that FreePIE uses id 13302, and 3750 is "Unity 64-bit"
+    def __init__(self, hWnd: Union[wintypes.HWND,int,str], trackir_profile_id: int =3750, data_fields: int =NPFIELDS_6DOF):  # Note that FreePIE uses id 13302, and 3750 is "Unity 64-bit"
         """This function expects the TrackIR software to be installed - specifically NPClient64.dll.
 
            It raises an Exception if the TrackIR software is not installed.
@@ -159,7 +282,13 @@ class TrackIRDLL():
             NOTE: TrackR will just refuse to send information if it doesn't have a hWnd, or if the window is closed.
             An alternative is to just pass it the hwnd of some other window. (Such as the TrackIR gui itself! hah).  But if you do that, you will
             have to kill the TrackIR gui every time you want to restart this program.
+
+           data_fields is the NP_RequestData bitfield of what the DLL should fill in, e.g. NPFIELDS_6DOF (the default),
+           NPFIELDS_6DOF | NPFIELDS_RAW for the raw imager position too, or NPFIELDS_ALL.  Use fields_for_mask(data_fields)
+           to get the matching field names for decode_fields().
         """
+        if winreg is None:
+            raise Exception("TrackIR is only supported on Windows")
         # Find the DLL folder
         key = winreg.OpenKeyEx(winreg.HKEY_CURRENT_USER, r"Software\\NaturalPoint\\NATURALPOINT\\NPClient Location")
         path, _ = winreg.QueryValueEx(key, "Path")
@@ -214,6 +343,7 @@ class TrackIRDLL():
 
 
         self.trackir_profile_id = trackir_profile_id
+        self.data_fields = data_fields
         if isinstance(hWnd, str):
             # Assume it is a string in the form 0x....   because that's what tkinter gives, for example
             hWnd = int(hWnd, 16)
@@ -241,7 +371,7 @@ class TrackIRDLL():
         logprint("Calling NP_RegisterWindowHandle")
         self.NP_RegisterWindowHandle(self.hWnd)
         logprint("Calling NP_RequestData")
-        self.NP_RequestData(119) # Request roll,pitch,yaw and x,y,z
+        self.NP_RequestData(self.data_fields) # By default roll,pitch,yaw and x,y,z (NPFIELDS_6DOF)
         logprint("Calling NP_RegisterProgramProfileID")
         self.NP_RegisterProgramProfileID(self.trackir_profile_id)
         logprint("Calling NP_StopCursor")
@@ -330,13 +460,23 @@ class TrackIRDLL():
         """
         return checkReturn(self.NP_StopDataTransmission_api())
 
-    def NP_GetData(self) -> TrackIR_6DOF_Data:
+    def NP_GetData(self, data: TrackIR_6DOF_Data = None) -> TrackIR_6DOF_Data:
         """Call NP_GetData in the Track IR dll to actually start sending data to use with the 6dof information
+
+           If data is given the DLL writes into it (e.g. a DataCollector ring slot) and it is returned,
+           otherwise a new TrackIR_6DOF_Data is allocated.
         """
-        data = TrackIR_6DOF_Data()
+        if data is None:
+            data = TrackIR_6DOF_Data()
         checkReturn(self.NP_GetData_api(ctypes.byref(data)))
         return data
 
+    def NP_GetDataStatus(self, data: TrackIR_6DOF_Data) -> int:
+        """Hot path variant of NP_GetData: fills data and returns the DLL status code (NP_OK, NP_ERR_NO_DATA, ...)
+           instead of raising, so polling loops can handle transient errors without exceptions
+        """
+        return self.NP_GetData_api(ctypes.byref(data))
+
     def NP_GetSignature(self) -> TrackIR_Signature_Data:
         """Call NP_GetData in the Track IR dll to get information about the DLL
         """
@@ -1,10 +1,19 @@
 # utils/trackir_wrapper.py
 
-from utils.trackir import TrackIRDLL
+from utils.trackir import TrackIRDLL, NPFIELDS_6DOF
+from utils.pose_source import PoseSource
 
-class TrackIRWrapper:
-    def __init__(self, hwnd):
-        self.trackir = TrackIRDLL(hwnd)
+class TrackIRWrapper(PoseSource):
+    def __init__(self, hwnd, data_fields=NPFIELDS_6DOF):
+        self.trackir = TrackIRDLL(hwnd, data_fields=data_fields)
+        self.data_fields = data_fields
 
-    def get_data(self):
-        return self.trackir.NP_GetData()
+    def get_data(self, out=None):
+        # out: optional TrackIR_6DOF_Data (e.g. a DataCollector ring slot) to fill instead of allocating
+        return self.trackir.NP_GetData(out)
+
+    def poll(self, out):
+        return self.trackir.NP_GetDataStatus(out)
+
+    def close(self):
+        self.trackir.stop()